@@ -1,24 +1,11 @@
-from fpdf import FPDF
 import streamlit as st
-from mcq_generator import AdvancedMCQGenerator
-from short_answer_generator import QuestionGenerator
-from truefalse_quiz import generate_true_false
-import io
-import fitz
-
-# ---------------- PDF GENERATION FUNCTION ---------------- #
-def generate_pdf(text: str) -> bytes:
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.set_font("Arial", size=12)
-
-    for line in text.split('\n'):
-        pdf.multi_cell(0, 10, line)
-
-    
-    pdf_bytes = pdf.output(dest='S').encode('latin1')
-    return pdf_bytes
+from quiz_export import EXPORT_FORMATS, export_bytes, question_items
+import tracing
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Generators, models, NLTK, PyMuPDF and the service client are imported on first use, so a
+# worker restart can serve the UI right away; `python startup.py` reports the import budget
 
 # ---------------- STYLING ---------------- #
 st.markdown("""
@@ -53,81 +40,208 @@ st.set_page_config(page_title="EduGenie", layout="centered")
 st.title("📝 EduGenie")
 st.markdown("🌟From context to quiz in seconds– EduGenie grants your learning wishes with AI precision.")
 
+# ---------------- QUIZ DISPLAY ---------------- #
+def show_mcqs(questions, start=1):
+    for idx, q in enumerate(questions, start):
+        st.markdown(f"**Q{idx}: {q['question']}**")
+        for i, option in enumerate(q['options']):
+            st.markdown(f"- {chr(65+i)}. {option}")
+        st.markdown(f"🟢 **Answer:** {chr(65 + q['correct_answer'])}\n\n---")
+
+
+def show_short_answers(questions, start=1):
+    for idx, q in enumerate(questions, start):
+        st.markdown(f"**Q{idx}: {q['question']}**")
+        st.markdown(f"🟢 **Expected Keyword:** {q['answer']}")
+        st.markdown("---")
+
+
+def show_true_false(questions, start=1):
+    for idx, (statement, label) in enumerate(questions, start):
+        st.markdown(f"**Q{idx}: {statement}**")
+        st.markdown(f"🟢 **Answer:** {'True' if label == 'ENTAILMENT' else 'False'}")
+        st.markdown("---")
+
+
+SECTION_DISPLAY = {
+    "mcq": ("📘 Multiple Choice Questions", show_mcqs),
+    "short_answer": ("📝 Short Answer Questions", show_short_answers),
+    "true_false": ("✅ True/False Questions", show_true_false),
+}
+
 # ---------------- INPUT SECTION ---------------- #
-uploaded_file = st.file_uploader("📄 Upload a PDF file", type="pdf")
-pdf_text = ""
-
-if uploaded_file is not None:
-    try:
-        doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-        for page in doc:
-            pdf_text += page.get_text()
-        st.success("✅ PDF uploaded successfully!")
-    except Exception as e:
-        st.error(f"Failed to read PDF: {str(e)}")
-
-context = pdf_text if pdf_text else st.text_area("📜 Enter your context/text here:", height=100)
-
-col1, col2 = st.columns(2)
-question_type = col1.selectbox("Question Type", ["Multiple Choice", "Short Answer", "True/False"])
-difficulty = col2.selectbox("Difficulty", ["easy", "medium", "hard"])
-num_questions = st.slider("🔢 Number of Questions", min_value=1, max_value=10, value=3)
-
-# ---------------- QUIZ GENERATION ---------------- #
-if st.button("⚡ Generate Quiz"):
-    if not context.strip():
-        st.warning("Please enter some context/text to generate questions.")
-    else:
-        with st.spinner("Generating quiz..."):
-            output = io.StringIO()
-            questions = []
-
-            if question_type == "Multiple Choice":
-                generator = AdvancedMCQGenerator()
-                try:
-                    questions = generator.generate_mcq(context, num_questions=num_questions, difficulty=difficulty)
-                    st.subheader("📘 Multiple Choice Questions")
-                    for idx, q in enumerate(questions, 1):
-                        st.markdown(f"**Q{idx}: {q['question']}**")
-                        for i, option in enumerate(q['options']):
-                            st.markdown(f"- {chr(65+i)}. {option}")
-                        st.markdown(f"🟢 **Answer:** {chr(65 + q['correct_answer'])}\n\n---")
-                        output.write(f"Q{idx}: {q['question']}\n")
-                        for i, option in enumerate(q['options']):
-                            output.write(f"  {chr(65+i)}. {option}\n")
-                        output.write(f"Answer: {chr(65 + q['correct_answer'])}\n\n")
-                except Exception as e:
-                    st.error(f"❌ Failed to generate MCQs: {str(e)}")
-
-            elif question_type == "Short Answer":
-                try:
-                    generator = QuestionGenerator()
-                    questions = generator.generate_questions(context, num_questions=num_questions, difficulty=difficulty)
-                    st.subheader("📝 Short Answer Questions")
-                    for idx, q in enumerate(questions, 1):
-                        st.markdown(f"**Q{idx}: {q['question']}**")
-                        st.markdown(f"🟢 **Expected Keyword:** {q['answer']}")
-                        st.markdown("---")
-                        output.write(f"Q{idx}: {q['question']}\nExpected keyword: {q['answer']}\n\n")
-                except Exception as e:
-                    st.error(f"❌ Failed to generate short answer questions: {str(e)}")
-
-            elif question_type == "True/False":
-                try:
-                    st.subheader("✅ True/False Questions")
-                    tf_generator = generate_true_false()
-                    sentences = tf_generator.validate_inputs(context, num_questions, difficulty)
-                    questions = tf_generator.generate_statements(context, num_questions, difficulty, sentences)
-
-                    for idx, (statement, label) in enumerate(questions, 1):
-                        st.markdown(f"**Q{idx}: {statement}**")
-                        st.markdown(f"🟢 **Answer:** {'True' if label == 'ENTAILMENT' else 'False'}")
-                        st.markdown("---")
-                        output.write(f"Q{idx}: {statement}\nAnswer: {'True' if label == 'ENTAILMENT' else 'False'}\n\n")
-                except Exception as e:
-                    st.error(f"❌ Failed to generate true/false questions: {str(e)}")
-
-            # ---------------- PDF DOWNLOAD ---------------- #
-            if questions:
-                pdf_bytes = generate_pdf(output.getvalue())
-                st.download_button("⬇️ Download Quiz as PDF", data=pdf_bytes, file_name="EduGenie_quiz.pdf", mime="application/pdf")
+show_timings = st.sidebar.checkbox("🔍 Show stage timings", value=False)
+request_trace = tracing.begin("request") if show_timings else None
+
+# The trace is ended however the run stops (st.stop, a rerun, an error), so it never stays attached to the script thread
+try:
+    uploaded_file = st.file_uploader("📄 Upload a PDF file", type="pdf")
+    pdf_text = ""
+
+    if uploaded_file is not None:
+        try:
+            # Page texts are cached by file hash, so reruns (e.g. changing the difficulty) never re-parse the file
+            with tracing.span("pdf_extraction"):
+                from pdf_extraction import pdf_text_cache, select_pages
+                page_texts = pdf_text_cache.page_texts(uploaded_file.getvalue())
+            page_spec = st.text_input(f"📑 Pages to use ({len(page_texts)} in total), e.g. 1-5, 8 — blank for all", value="")
+            try:
+                pdf_text = select_pages(page_texts, page_spec)
+                st.success("✅ PDF uploaded successfully!")
+            except ValueError as e:
+                st.error(str(e))
+        except Exception as e:
+            st.error(f"Failed to read PDF: {str(e)}")
+
+    context = pdf_text if pdf_text else st.text_area("📜 Enter your context/text here:", height=100)
+
+    col1, col2 = st.columns(2)
+    question_type = col1.selectbox("Question Type", ["Multiple Choice", "Short Answer", "True/False", "Mixed"])
+    difficulty = col2.selectbox("Difficulty", ["easy", "medium", "hard"])
+    num_questions = st.slider("🔢 Number of Questions" + (" per Section" if question_type == "Mixed" else ""), min_value=1, max_value=10, value=3)
+    semantic_distractors = st.checkbox("🧠 Rank MCQ distractors by meaning (slower first run)", value=False)
+
+    # ---------------- QUIZ GENERATION ---------------- #
+    # With QUIZ_SERVICE_URL set, quizzes come from a running quiz_service.py instead of models loaded here
+    service_url = os.environ.get("QUIZ_SERVICE_URL")
+
+    if st.button("⚡ Generate Quiz"):
+        if not context.strip():
+            st.warning("Please enter some context/text to generate questions.")
+        else:
+            with st.spinner("Generating quiz..."):
+                questions = []
+                sections = {}   # Mixed quizzes: question type -> questions
+                with tracing.span("lazy_imports"):
+                    from document import Document
+                    from question_bank import draw_quiz
+                    if service_url:
+                        from quiz_service import request_quiz
+                document = Document(context)   # Only hashed here; tokenized on first use and shared by the generators
+
+                # Documents ingested with question_bank.py are served from their stored pools, with no model calls
+                def from_bank(section):
+                    with tracing.span("question_bank"):
+                        return draw_quiz(document, section, difficulty, num_questions)
+
+                type_key = {"Multiple Choice": "mcq", "Short Answer": "short_answer", "True/False": "true_false"}.get(question_type)
+                banked = from_bank(type_key) if type_key else None
+                if banked:
+                    st.caption("Served from the question bank.")
+
+                if question_type == "Multiple Choice":
+                    try:
+                        if banked:
+                            questions = banked
+                        elif service_url:
+                            questions = request_quiz(service_url, context, "mcq", difficulty, num_questions)
+                        else:
+                            with tracing.span("lazy_imports"):
+                                from mcq_generator import AdvancedMCQGenerator
+                            generator = AdvancedMCQGenerator(distractor_mode="semantic" if semantic_distractors else "random")
+                            questions = generator.generate_mcq(document, num_questions=num_questions, difficulty=difficulty)
+                        st.subheader("📘 Multiple Choice Questions")
+                        show_mcqs(questions)
+                    except Exception as e:
+                        st.error(f"❌ Failed to generate MCQs: {str(e)}")
+
+                elif question_type == "Short Answer":
+                    try:
+                        st.subheader("📝 Short Answer Questions")
+                        if banked:
+                            questions = banked
+                        elif service_url:
+                            questions = request_quiz(service_url, context, "short_answer", difficulty, num_questions)
+                        else:
+                            with tracing.span("lazy_imports"):
+                                from short_answer_generator import QuestionGenerator
+                            generator = QuestionGenerator()
+                            questions = generator.generate_questions(document, num_questions=num_questions, difficulty=difficulty)
+                            stats = generator.last_stats
+                            if stats.get('cached'):
+                                st.caption("Served from the quiz cache.")
+                            else:
+                                st.caption(f"Accepted {stats['accepted']} of {stats['attempts']} candidate questions in {stats['waves']} batch(es).")
+                        show_short_answers(questions)
+                    except Exception as e:
+                        st.error(f"❌ Failed to generate short answer questions: {str(e)}")
+
+                elif question_type == "True/False":
+                    try:
+                        st.subheader("✅ True/False Questions")
+                        if banked:
+                            questions = banked
+                        elif service_url:
+                            questions = request_quiz(service_url, context, "true_false", difficulty, num_questions)
+                        else:
+                            with tracing.span("lazy_imports"):
+                                from truefalse_quiz import generate_true_false
+                            tf_generator = generate_true_false()
+                            # Sentences are only split (and validated) on a quiz cache miss
+                            questions = tf_generator.generate_statements(document, num_questions, difficulty)
+                        show_true_false(questions)
+                    except Exception as e:
+                        st.error(f"❌ Failed to generate true/false questions: {str(e)}")
+
+                elif question_type == "Mixed":
+                    # All three sections generated concurrently from the one Document; the quiz takes
+                    # about as long as its slowest section
+                    counts = {}
+                    for section in SECTION_DISPLAY:
+                        banked = from_bank(section)
+                        if banked:
+                            sections[section] = banked
+                        else:
+                            counts[section] = num_questions
+                    errors = {}
+                    if not counts:
+                        st.caption("Served from the question bank.")
+                    elif service_url:
+                        with ThreadPoolExecutor(len(counts)) as pool:
+                            futures = {section: pool.submit(request_quiz, service_url, context, section, difficulty, count)
+                                       for section, count in counts.items()}
+                        for section, future in futures.items():
+                            try:
+                                sections[section] = future.result()
+                            except Exception as e:
+                                errors[section] = str(e)
+                    else:
+                        with tracing.span("lazy_imports"):
+                            from mixed_quiz import MixedQuizGenerator
+                        mixed = MixedQuizGenerator(distractor_mode="semantic" if semantic_distractors else "random")
+                        generated, errors = mixed.generate(document, counts, difficulty)
+                        sections.update(generated)
+                    start = 1
+                    for section, (title, show) in SECTION_DISPLAY.items():
+                        if section in errors:
+                            st.error(f"❌ Failed to generate the {title[2:]} section: {errors[section]}")
+                        elif sections.get(section):
+                            st.subheader(title)
+                            show(sections[section], start)
+                            start += len(sections[section])
+
+                # ---------------- DOWNLOADS ---------------- #
+                if questions or sections:
+                    if sections:
+                        items = []
+                        for section in SECTION_DISPLAY:   # Numbered in the order the sections are shown
+                            items.extend(question_items(section, sections.get(section, []), start=len(items) + 1))
+                    else:
+                        items = list(question_items(type_key, questions))
+                    for column, (fmt, (mime, extension)) in zip(st.columns(len(EXPORT_FORMATS)), EXPORT_FORMATS.items()):
+                        with tracing.span(f"export_{fmt}"):
+                            data = export_bytes(items, fmt)
+                        column.download_button(f"⬇️ {fmt.upper()}", data=data, file_name=f"EduGenie_quiz.{extension}", mime=mime)
+finally:
+    if request_trace is not None:
+        tracing.end(request_trace)
+
+# ---------------- DEBUG PANEL ---------------- #
+if request_trace is not None:
+    with st.sidebar.expander("Stage timings", expanded=True):
+        st.caption(f"This run: {request_trace.duration * 1000:.0f} ms")
+        st.table(request_trace.breakdown())
+        if request_trace.counters:
+            st.json(request_trace.counters)
+        if tracing.is_enabled():
+            st.code(tracing.prometheus_text(), language="text")
@@ -0,0 +1,261 @@
+# batch_generate.py
+"""
+Offline bulk quiz generation.
+
+Reads a directory of PDFs/text files or a JSONL manifest, spreads the documents
+across worker processes that each load the models once, streams every quiz to
+CSV or JSONL and records finished documents in a checkpoint file so an
+interrupted run resumes where it stopped.
+
+    python batch_generate.py --input docs/ --question-type mcq --workers 4
+    python batch_generate.py --manifest requests.jsonl --output outputs/quizzes.jsonl
+"""
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+QUESTION_TYPES = ["mcq", "short_answer", "true_false"]
+CSV_FIELDS = ["document_id", "question_type", "difficulty", "number", "question", "options", "answer", "confidence"]
+
+# Per-process generators, created once by the pool initializer
+_generators = {}
+
+
+# ---------------- INPUTS ---------------- #
+def read_text(path):
+    """Text of a PDF or plain-text file"""
+    if path.lower().endswith(".pdf"):
+        from pdf_extraction import extract_text
+        with open(path, "rb") as f:
+            return extract_text(f.read(), workers=1)   # Already one document per worker process
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def iter_jobs(args):
+    """Jobs as dicts: id, path or text, question_type, difficulty, num_questions"""
+    defaults = {"question_type": args.question_type, "difficulty": args.difficulty, "num_questions": args.num_questions}
+    if args.manifest:
+        with open(args.manifest, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                job = dict(defaults)
+                job["id"] = str(entry.get("id") or entry.get("request_id") or f"line-{line_number}")
+                if "path" in entry:
+                    job["path"] = entry["path"]
+                else:
+                    job["text"] = entry.get("text") or entry.get("body") or ""
+                for key in defaults:
+                    if key in entry:
+                        job[key] = entry[key]
+                yield job
+    else:
+        for name in sorted(os.listdir(args.input)):
+            if name.lower().endswith((".pdf", ".txt")):
+                yield dict(defaults, id=name, path=os.path.join(args.input, name))
+
+
+# ---------------- WORKERS ---------------- #
+def init_worker(threads, question_types):
+    """Load the generators this run needs, once per worker process"""
+    import torch
+    torch.set_num_threads(threads)   # Keep workers from oversubscribing the cores
+    for question_type in question_types:
+        get_generator(question_type)
+
+
+def get_generator(question_type):
+    if question_type not in _generators:
+        if question_type == "mcq":
+            from mcq_generator import AdvancedMCQGenerator
+            _generators[question_type] = AdvancedMCQGenerator()
+        elif question_type == "short_answer":
+            from short_answer_generator import QuestionGenerator
+            _generators[question_type] = QuestionGenerator()
+        else:
+            from truefalse_quiz import generate_true_false
+            _generators[question_type] = generate_true_false()
+    return _generators[question_type]
+
+
+def run_job(job):
+    """Generate one quiz; returns (job id, rows, error message or None)"""
+    try:
+        from document import Document
+        question_type, difficulty, count = job["question_type"], job["difficulty"], int(job["num_questions"])
+        if question_type not in QUESTION_TYPES:   # e.g. a manifest typo; would otherwise fall through to true/false
+            raise ValueError(f"question_type must be one of {QUESTION_TYPES}, got {question_type!r}")
+        document = Document(job["text"] if "text" in job else read_text(job["path"]))
+        generator = get_generator(question_type)
+        if question_type == "mcq":
+            questions = generator.generate_mcq(document, num_questions=count, difficulty=difficulty)
+        elif question_type == "short_answer":
+            questions = generator.generate_questions(document, num_questions=count, difficulty=difficulty)
+        else:
+            questions = generator.generate_statements(document, count, difficulty)
+        return job["id"], question_rows(job["id"], question_type, difficulty, questions), None
+    except Exception as e:
+        return job["id"], [], f"{type(e).__name__}: {e}"
+
+
+def question_rows(document_id, question_type, difficulty, questions):
+    """Flatten a generator's output into CSV/JSONL rows"""
+    rows = []
+    for number, q in enumerate(questions, 1):
+        row = {"document_id": document_id, "question_type": question_type, "difficulty": difficulty, "number": number,
+               "options": "", "confidence": ""}
+        if question_type == "mcq":
+            row.update(question=q["question"], options=" | ".join(q["options"]), answer=chr(65 + q["correct_answer"]))
+        elif question_type == "short_answer":
+            row.update(question=q["question"], answer=q["answer"], confidence=round(q["confidence"], 4))
+        else:
+            statement, label = q
+            row.update(question=statement, answer="True" if label == "ENTAILMENT" else "False")
+        rows.append(row)
+    return rows
+
+
+# ---------------- OUTPUT ---------------- #
+class ResultWriter:
+    """
+    Appends rows to CSV or JSONL (by extension) and flushes after every document.
+    An existing file is only resumed when it is one of ours (CSV header equal to
+    CSV_FIELDS, JSONL rows with a document_id); anything else is moved aside.
+    Rows of documents missing from the checkpoint, left by a crash between
+    writing them and checkpointing, are dropped so the rerun does not
+    duplicate them.
+    """
+    def __init__(self, path, done=()):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.jsonl = path.endswith(".jsonl")
+        rows, clean = self._existing(path) if os.path.exists(path) else ([], True)
+        if rows is None:
+            moved = f"{path}.{time.strftime('%Y%m%dT%H%M%S')}.bak"
+            os.replace(path, moved)
+            print(f"{path} is not a batch_generate output; moved it to {moved}", file=sys.stderr)
+            rows, clean = [], True
+        kept = [row for row in rows if row.get("document_id") in done]
+        if not clean or len(kept) < len(rows):
+            self._rewrite(kept)
+        self.file = open(path, "a", encoding="utf-8", newline="")
+        if not self.jsonl:
+            self.csv = csv.DictWriter(self.file, fieldnames=CSV_FIELDS)
+            if self.file.tell() == 0:
+                self.csv.writeheader()
+
+    def _existing(self, path):
+        """(rows, clean) of a file we wrote, clean when it needs no rewrite; (None, False) for a foreign file"""
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            content = f.read()
+        if not content:
+            return [], True
+        clean = content.endswith("\n")   # A missing newline means the last row was cut short
+        if self.jsonl:
+            rows = []
+            for number, line in enumerate(content.splitlines()):
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                if not isinstance(row, dict) or "document_id" not in row:
+                    if number == 0:
+                        return None, False
+                    clean = False   # Partial row from an interrupted write; its document is not checkpointed
+                    continue
+                rows.append(row)
+            return rows, clean
+        reader = csv.reader(io.StringIO(content))
+        if next(reader, None) != CSV_FIELDS:
+            return None, False
+        rows = []
+        for values in reader:
+            if len(values) == len(CSV_FIELDS):
+                rows.append(dict(zip(CSV_FIELDS, values)))
+            else:
+                clean = False
+        return rows, clean
+
+    def _rewrite(self, rows):
+        """Replace the file with rows (plus the CSV header)"""
+        scratch = self.path + ".rewrite"
+        with open(scratch, "w", encoding="utf-8", newline="") as f:
+            if self.jsonl:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            else:
+                writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
+        os.replace(scratch, self.path)
+
+    def write(self, rows):
+        for row in rows:
+            if self.jsonl:
+                self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            else:
+                self.csv.writerow(row)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate quizzes for many documents with a pool of worker processes")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="Directory of .pdf/.txt files")
+    source.add_argument("--manifest", help="JSONL file with id and path or text (or request_id/body) per line")
+    parser.add_argument("--output", default=os.path.join("outputs", "generated_questions.csv"), help=".csv or .jsonl")
+    parser.add_argument("--checkpoint", help="Finished document ids (default: <output>.done)")
+    parser.add_argument("--question-type", choices=QUESTION_TYPES, default="mcq")
+    parser.add_argument("--difficulty", choices=["easy", "medium", "hard"], default="medium")
+    parser.add_argument("--num-questions", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or args.output + ".done"
+    done = load_checkpoint(checkpoint_path)
+    jobs = [job for job in iter_jobs(args) if job["id"] not in done]
+    print(f"{len(jobs)} document(s) to process, {len(done)} already done")
+    if not jobs:
+        return
+
+    workers = max(1, min(args.workers, len(jobs)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    writer = ResultWriter(args.output, done)
+    failures = 0
+    # spawn: each worker imports torch and loads its models cleanly
+    context = multiprocessing.get_context("spawn")
+    question_types = sorted({job["question_type"] for job in jobs} & set(QUESTION_TYPES))   # Unknown types fail in run_job
+    with context.Pool(workers, initializer=init_worker, initargs=(threads, question_types)) as pool, open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+        for finished, (job_id, rows, error) in enumerate(pool.imap_unordered(run_job, jobs), 1):
+            if error:
+                failures += 1
+                print(f"[{finished}/{len(jobs)}] {job_id}: failed ({error})", file=sys.stderr)
+                continue
+            # Rows first, then the checkpoint entry, so a crash never loses a finished quiz
+            writer.write(rows)
+            checkpoint.write(job_id + "\n")
+            checkpoint.flush()
+            print(f"[{finished}/{len(jobs)}] {job_id}: {len(rows)} question(s)")
+    writer.close()
+    print(f"Done. {len(jobs) - failures} succeeded, {failures} failed; results in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
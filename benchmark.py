@@ -0,0 +1,336 @@
+# benchmark.py
+"""
+Latency, throughput and peak memory of the quiz generators across context
+sizes and question counts. Results are written as JSON so two runs (say, two
+commits) can be compared:
+
+    python benchmark.py --stub                               # pure-Python overhead, no model weights
+    python benchmark.py --pages 1 10 50 200 --questions 1 10 50
+    python benchmark.py --compare outputs/benchmarks/old.json outputs/benchmarks/new.json
+
+--stub swaps the QA and NLI models for deterministic stand-ins with a local
+WordPiece tokenizer, so the numbers show tokenization, retrieval, span
+search, distractors and bookkeeping on their own.
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+BENCHMARK_DIR = os.path.join("outputs", "benchmarks")
+TARGETS = ["mcq", "short_answer", "true_false", "pdf"]
+WORDS_PER_PAGE = 500
+
+# Vocabulary for the synthetic corpus
+_SUBJECTS = ["The Sun", "Jupiter", "The committee", "Marie Curie", "The river", "Photosynthesis", "The engine",
+             "Ancient Rome", "The library", "Mitochondria", "The treaty", "Isaac Newton", "The glacier", "The market"]
+_VERBS = ["produces", "influenced", "contains", "describes", "supports", "transformed", "measures", "protects",
+          "explains", "connects", "requires", "reduced"]
+_OBJECTS = ["the energy of distant planets", "eight major trade routes", "the growth of early cities",
+            "several chemical reactions", "the structure of the atom", "most of the northern valley",
+            "the laws of motion", "a network of small villages", "the cells of every plant",
+            "the balance between supply and demand", "the history of the region", "the temperature of the ocean"]
+_CLAUSES = ["during the long winter", "according to recent studies", "for more than a century",
+            "in the modern era", "despite strong opposition", "because of its unusual position"]
+
+
+# ---------------- CORPUS ---------------- #
+def synthetic_text(pages, seed=13):
+    """Deterministic prose of roughly pages * WORDS_PER_PAGE words"""
+    rng = random.Random(seed)
+    sentences, words = [], 0
+    while words < pages * WORDS_PER_PAGE:
+        sentence = f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} {rng.choice(_CLAUSES)}."
+        sentences.append(sentence)
+        words += len(sentence.split())
+    return " ".join(sentences)
+
+
+def corpus_text(pages, corpus=None):
+    """Context of about the given number of pages, from --corpus (repeated as needed) or synthetic prose"""
+    if corpus is None:
+        return synthetic_text(pages)
+    words = corpus.split()
+    target = pages * WORDS_PER_PAGE
+    return " ".join(words[i % len(words)] for i in range(target))
+
+
+# ---------------- STUB MODELS ---------------- #
+def _stub_tokenizer(corpus=None):
+    """BERT-style WordPiece tokenizer over the corpus vocabulary, built locally without downloads"""
+    from transformers import BertTokenizerFast
+    text = " ".join(_SUBJECTS + _VERBS + _OBJECTS + _CLAUSES) + " " + (corpus or "")
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    vocab += sorted({word.strip(".,;:!?\"'()").lower() for word in text.split()} - {""})
+    vocab += list(".,;:!?\"'()-") + [chr(c) for c in range(97, 123)] + [f"##{chr(c)}" for c in range(97, 123)]
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+        f.write("\n".join(dict.fromkeys(vocab)))
+    try:
+        return BertTokenizerFast(vocab_file=f.name, model_max_length=512)
+    finally:
+        os.remove(f.name)
+
+
+class StubQAModel:
+    """Start/end logits peaked at a position derived from each row's ids; no weights"""
+    def __init__(self, name):
+        import torch
+        self.name_or_path = f"{name}:stub"
+        self.device = torch.device("cpu")
+        self.config = SimpleNamespace()
+
+    def __call__(self, input_ids, attention_mask, **_):
+        import torch
+        lengths = attention_mask.sum(dim=1)
+        # Somewhere in the second half of each row, which is context for all but the shortest windows
+        position = lengths // 2 + (input_ids * attention_mask).sum(dim=1) % (lengths // 2 - 1).clamp(min=1)
+        columns = torch.arange(input_ids.shape[1]).unsqueeze(0)
+        start_logits = (columns == position.unsqueeze(1)).float() * 12.0
+        end_logits = (columns == (position + 1).clamp(max=lengths - 2).unsqueeze(1)).float() * 12.0
+        return SimpleNamespace(start_logits=start_logits, end_logits=end_logits)
+
+
+class StubNLIModel:
+    """Three-way logits picked from the pair's ids; no weights"""
+    def __init__(self, name):
+        import torch
+        self.name_or_path = f"{name}:stub"
+        self.device = torch.device("cpu")
+        self.config = SimpleNamespace(id2label={0: "CONTRADICTION", 1: "NEUTRAL", 2: "ENTAILMENT"})
+
+    def __call__(self, input_ids, attention_mask, **_):
+        import torch
+        label = (input_ids * attention_mask).sum(dim=1) % 3
+        return SimpleNamespace(logits=torch.nn.functional.one_hot(label, 3).float() * 4.0)
+
+
+def install_stub_models(corpus=None):
+    """Put stub QA and NLI models into the shared registry under the keys the generators request"""
+    import model_registry
+    from model_registry import NLI_MODEL, registry
+    from short_answer_generator import QuestionGenerator
+
+    model_registry.INFERENCE_BACKEND = "torch"
+    tokenizer = _stub_tokenizer(corpus)
+    short_answer_model = inspect.signature(QuestionGenerator).parameters["model_name"].default
+    for model_name in (model_registry.DEFAULT_QA_MODEL, short_answer_model):
+        stub = SimpleNamespace(model=StubQAModel(model_name or model_registry.DEFAULT_QA_CHECKPOINT), tokenizer=tokenizer)
+        registry.get(("question-answering", model_name, ()), lambda stub=stub: stub)
+    nli = SimpleNamespace(model=StubNLIModel(NLI_MODEL), tokenizer=tokenizer)
+    registry.get(("text-classification", NLI_MODEL, ()), lambda: nli)
+
+
+# ---------------- MEASUREMENT ---------------- #
+def current_rss():
+    """Resident set size of this process in bytes (0 where it cannot be read)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if platform.system() == "Darwin" else peak * 1024
+        except ImportError:
+            return 0
+
+
+class PeakRSS:
+    """Samples RSS on a background thread while the block runs"""
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.baseline = self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        self.baseline = self.peak = current_rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+class Targets:
+    """One callable per benchmark target; each returns the generated questions"""
+    def __init__(self, difficulty):
+        from mcq_generator import AdvancedMCQGenerator
+        from short_answer_generator import QuestionGenerator
+        from truefalse_quiz import generate_true_false
+
+        self.difficulty = difficulty
+        # Caches and memos off: every repeat pays for the full generation path
+        self.mcq = AdvancedMCQGenerator(cache=None)
+        self.short_answer = QuestionGenerator(cache=None)
+        self.true_false = generate_true_false(cache=None)
+        for generator in (self.mcq, self.short_answer):
+            generator.qa_runner.memo = None
+
+    def run(self, target, text, count):
+        from document import Document
+        from nli_scorer import classify_statements
+        from quiz_export import export_bytes, question_items
+
+        random.seed(0)
+        if target == "pdf":
+            return export_bytes(question_items("mcq", sample_mcqs(count)), "pdf")
+        document = Document(text)
+        if target == "mcq":
+            return self.mcq.generate_mcq(document, num_questions=count, difficulty=self.difficulty)
+        if target == "short_answer":
+            return self.short_answer.generate_questions(document, num_questions=count, difficulty=self.difficulty)
+        sentences = self.true_false.validate_inputs(document, count, self.difficulty)
+        statements = self.true_false.generate_statements(document, count, self.difficulty, sentences)
+        classify_statements(document, [statement for statement, _ in statements])
+        return statements
+
+
+def sample_mcqs(count):
+    """MCQs in the shape AdvancedMCQGenerator returns, for the export target"""
+    return [{"question": f"What is the primary significance of the structure of the atom in question {idx}?",
+             "options": _OBJECTS[idx % 8:idx % 8 + 4], "correct_answer": 0} for idx in range(1, count + 1)]
+
+
+def measure(targets, target, text, count, repeats):
+    timings, produced = [], 0
+    with PeakRSS() as memory:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = targets.run(target, text, count)
+            timings.append(time.perf_counter() - start)
+            produced = count if target == "pdf" else len(result)
+    median = statistics.median(timings)
+    return {
+        "latency_s": {"min": min(timings), "median": median, "mean": statistics.fmean(timings)},
+        "produced": produced,
+        "questions_per_s": produced / median if median else None,
+        "peak_rss_mb": round(memory.peak / 2**20, 1),
+        "rss_delta_mb": round((memory.peak - memory.baseline) / 2**20, 1),
+    }
+
+
+def run_benchmarks(args):
+    from model_registry import registry
+
+    corpus = None
+    if args.corpus:
+        with open(args.corpus, "r", encoding="utf-8") as f:
+            corpus = f.read()
+    if args.stub:
+        install_stub_models(corpus)
+    registry.max_idle_seconds = None   # Keep models resident for the whole run
+
+    targets = Targets(args.difficulty)
+    texts = {pages: corpus_text(pages, corpus) for pages in args.pages}
+    for target in args.targets:   # Warm-up: lazy loads and first-call costs stay out of the numbers
+        targets.run(target, texts[min(args.pages)], 1)
+
+    results = []
+    for target in args.targets:
+        for pages in ([None] if target == "pdf" else args.pages):
+            for count in args.questions:
+                text = texts[pages] if pages else ""
+                result = {"target": target, "pages": pages, "words": len(text.split()), "questions": count, "repeats": args.repeats}
+                result.update(measure(targets, target, text, count, args.repeats))
+                results.append(result)
+                print(f"{target:>12} pages={str(pages):>4} questions={count:>3}  "
+                      f"median {result['latency_s']['median'] * 1000:9.1f} ms  "
+                      f"{result['questions_per_s'] or 0:8.2f} q/s  peak RSS {result['peak_rss_mb']:8.1f} MB")
+    return results
+
+
+def run_metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import model_registry
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "stub": args.stub,
+        "backend": "stub" if args.stub else model_registry.INFERENCE_BACKEND,
+        "difficulty": args.difficulty,
+        "corpus": args.corpus or "synthetic",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+# ---------------- COMPARISON ---------------- #
+def _case(result):
+    return (result["target"], result["pages"], result["questions"])
+
+
+def compare(baseline_path, candidate_path, threshold=1.10):
+    """Print the median latency ratio per case; returns the cases slower than threshold"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {_case(r): r for r in json.load(f)["results"]}
+    with open(candidate_path, "r", encoding="utf-8") as f:
+        candidate = json.load(f)["results"]
+
+    regressions = []
+    for result in candidate:
+        before = baseline.get(_case(result))
+        if before is None:
+            continue
+        ratio = result["latency_s"]["median"] / before["latency_s"]["median"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  <-- slower"
+            regressions.append(_case(result))
+        print(f"{result['target']:>12} pages={str(result['pages']):>4} questions={result['questions']:>3}  "
+              f"{before['latency_s']['median'] * 1000:9.1f} -> {result['latency_s']['median'] * 1000:9.1f} ms  x{ratio:.2f}  "
+              f"RSS {before['peak_rss_mb']:.0f} -> {result['peak_rss_mb']:.0f} MB{flag}")
+    print(f"{len(regressions)} case(s) slower than x{threshold:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the quiz generators across context sizes and question counts")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=TARGETS)
+    parser.add_argument("--pages", nargs="+", type=int, default=[1, 10, 50, 200], help=f"Context sizes in pages of ~{WORDS_PER_PAGE} words")
+    parser.add_argument("--questions", nargs="+", type=int, default=[1, 10, 50])
+    parser.add_argument("--difficulty", choices=["easy", "medium", "hard"], default="medium")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--stub", action="store_true", help="Replace the QA/NLI models with stubs to isolate Python overhead")
+    parser.add_argument("--corpus", help="Text file used (repeated) as context instead of synthetic prose")
+    parser.add_argument("--output", help=f"Results JSON (default: {BENCHMARK_DIR}/<time>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"), help="Compare two result files and exit")
+    parser.add_argument("--threshold", type=float, default=1.10, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(*args.compare, threshold=args.threshold)
+        raise SystemExit(1 if regressions else 0)
+
+    report = {"meta": run_metadata(args), "results": run_benchmarks(args)}
+    output = args.output
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(BENCHMARK_DIR, f"{stamp}-{report['meta']['commit'] or 'nogit'}{'-stub' if args.stub else ''}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
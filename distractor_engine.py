@@ -0,0 +1,72 @@
+# distractor_engine.py
+import bisect
+import random
+
+FALLBACK_DISTRACTORS = ["A partially related historical context","An alternative interpretation","A peripheral aspect of the main theme"]
+
+# Number of content words kept per distractor phrase
+PHRASE_LENGTHS = {'easy': 2, 'medium': 3, 'hard': 5}
+
+
+class DistractorPool:
+    """
+    Distractor candidates for one document, precomputed per difficulty.
+    The lower-cased candidate sentences are joined into one string, so the
+    ones containing the correct answer (as a substring, like "Parisian" for
+    "Paris") are found with one str.find per match instead of a Python-level
+    loop over every sentence, and each distractor is drawn in O(1).
+    """
+    def __init__(self, document):
+        # Candidate sentences: the ones long enough to yield a phrase
+        self.sentences = [i for i, sent in enumerate(document.sentences) if len(sent.split()) > 3]
+        self.lowered = [document.sentences[i].lower() for i in self.sentences]
+        self.phrases = {
+            difficulty: [' '.join(document.content_tokens[i][:length]).strip() for i in self.sentences]
+            for difficulty, length in PHRASE_LENGTHS.items()
+        }
+
+        # NUL never occurs in an answer, so no match can span two sentences
+        self.joined = "\0".join(self.lowered)
+        self.starts = []
+        offset = 0
+        for sentence in self.lowered:
+            self.starts.append(offset)
+            offset += len(sentence) + 1
+
+    def containing(self, answer):
+        """Candidate positions whose sentence contains the answer as a substring"""
+        answer = answer.lower()
+        if not answer:
+            return set(range(len(self.sentences)))
+        found = set()
+        start = self.joined.find(answer)
+        while start != -1:
+            position = bisect.bisect_right(self.starts, start) - 1
+            found.add(position)
+            # Resume at the next sentence: one hit per sentence is enough
+            if position + 1 >= len(self.starts):
+                break
+            start = self.joined.find(answer, self.starts[position + 1])
+        return found
+
+    def draw(self, correct_answer, difficulty, count=3, rng=random):
+        """Draw distractor phrases from sentences that do not contain the correct answer"""
+        phrases = self.phrases.get(difficulty, self.phrases['medium'])
+        excluded = self.containing(correct_answer)
+        available = len(self.sentences) - len(excluded)
+        distractors = []
+        while len(distractors) < count:
+            if available > 0:
+                position = rng.randrange(len(self.sentences))
+                if position in excluded:
+                    # Mostly-excluded pools would make rejection sampling slow; pick directly instead
+                    if available * 4 < len(self.sentences):
+                        position = rng.choice([p for p in range(len(self.sentences)) if p not in excluded])
+                    else:
+                        continue
+                excluded.add(position)
+                available -= 1
+                distractors.append(phrases[position])
+            else:
+                distractors.append(rng.choice(FALLBACK_DISTRACTORS))
+        return distractors
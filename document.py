@@ -0,0 +1,113 @@
+# document.py
+import hashlib
+from nltk.corpus import stopwords
+from nltk.tokenize import word_tokenize
+from passage_index import PassageIndex, split_sentences
+from distractor_engine import DistractorPool
+import nltk_resources
+import tracing
+
+_stop_words = None
+
+
+def stop_words():
+    """English stopwords, loaded once per process"""
+    global _stop_words
+    if _stop_words is None:
+        nltk_resources.ensure('stopwords')
+        _stop_words = frozenset(stopwords.words('english'))
+    return _stop_words
+
+
+class Document:
+    """
+    One input text, tokenized once and shared by every generator.
+    Holds the sentences with their character offsets, the word tokens of each
+    sentence and the same tokens with stopwords removed. Only the content hash
+    is computed up front, so quiz cache and question bank lookups never
+    tokenize; everything else is built on first use.
+    """
+    __slots__ = ("text", "digest", "_words", "_sentences", "_sentence_offsets", "_tokens", "_content_tokens", "_passage_index", "_distractor_pool")
+
+    def __init__(self, text):
+        self.text = text
+        self.digest = digest_of(text)
+        self._words = None
+        self._sentences = None
+        self._sentence_offsets = None
+        self._tokens = None
+        self._content_tokens = None
+        self._passage_index = None
+        self._distractor_pool = None
+
+    def __len__(self):
+        return len(self.words)
+
+    @property
+    def words(self):
+        """Whitespace-separated words of the text"""
+        if self._words is None:
+            self._words = self.text.split()
+        return self._words
+
+    @property
+    def sentences(self):
+        """Sentences of the text"""
+        if self._sentences is None:
+            with tracing.span("sentence_split"):
+                self._sentences, self._sentence_offsets = split_sentences(self.text)
+        return self._sentences
+
+    @property
+    def sentence_offsets(self):
+        """Character offset of each sentence in the text"""
+        if self._sentence_offsets is None:
+            self.sentences
+        return self._sentence_offsets
+
+    @property
+    def tokens(self):
+        """Word tokens of each sentence"""
+        if self._tokens is None:
+            with tracing.span("tokenization"):
+                self._tokens = [tuple(word_tokenize(sentence)) for sentence in self.sentences]
+        return self._tokens
+
+    @property
+    def content_tokens(self):
+        """Word tokens of each sentence without stopwords"""
+        if self._content_tokens is None:
+            stop = stop_words()
+            self._content_tokens = [tuple(w for w in words if w.lower() not in stop) for words in self.tokens]
+        return self._content_tokens
+
+    def passage_index(self):
+        """BM25 passage index over this document, built on first use"""
+        if self._passage_index is None:
+            with tracing.span("passage_index"):
+                self._passage_index = PassageIndex(self.text, sentences=self.sentences, sentence_offsets=self.sentence_offsets)
+        return self._passage_index
+
+    def distractor_pool(self):
+        """Distractor candidates for this document, built on first use"""
+        if self._distractor_pool is None:
+            with tracing.span("distractor_pool"):
+                self._distractor_pool = DistractorPool(self)
+        return self._distractor_pool
+
+
+def as_document(source):
+    """Accept either raw text or an already built Document"""
+    return source if isinstance(source, Document) else Document(source)
+
+
+def text_of(source):
+    """Raw text of either a string or a Document, without tokenizing anything"""
+    return source.text if isinstance(source, Document) else source
+
+
+def digest_of(source):
+    """Content hash of either a string or a Document"""
+    if isinstance(source, Document):
+        return source.digest
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()
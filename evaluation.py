@@ -0,0 +1,233 @@
+# evaluation.py
+"""
+Batched evaluation of question-generation checkpoints.
+
+Questions are generated in length-sorted, dynamically padded batches (greedy
+or beam search), then scored against the references over the whole set at
+once: BLEU-1 and ROUGE-1 from sparse unigram count matrices, ROUGE-L with a
+bit-parallel LCS (optionally spread over worker processes) and cosine
+similarity from one batched pass of the shared sentence encoder.
+
+    python evaluation.py --model valhalla/t5-base-qg-hl --data train_v0.2_QuaC.json --limit 2000 --input-format highlight
+"""
+import argparse
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+METRICS = ["bleu1", "rouge1", "rougeL", "cosine"]
+_ROUGE_TOKEN = re.compile(r"[^a-z0-9]+")
+
+
+# ---------------- INPUTS ---------------- #
+def highlight_input(context, answer, prefix="generate question: "):
+    """Input for highlight-style QG models such as valhalla/t5-base-qg-hl"""
+    if answer in context:
+        context = context.replace(answer, f"<hl> {answer} <hl>", 1)
+    else:
+        context = f"{context} <hl> {answer} <hl>"
+    return prefix + context
+
+
+def model_inputs(examples, input_format="context"):
+    """Source texts for {"context", "answer"} examples: the raw context or the highlighted form"""
+    if input_format == "highlight":
+        return [highlight_input(e["context"], e["answer"]) for e in examples]
+    return [e["context"] for e in examples]
+
+
+# ---------------- GENERATION ---------------- #
+def generate_predictions(model, tokenizer, texts, batch_size=16, num_beams=1, max_input_length=512, max_new_tokens=64, **generate_kwargs):
+    """
+    Generated text for every input, in input order. Inputs are sorted by length
+    and padded per batch; num_beams=1 is greedy decoding.
+    """
+    import torch
+
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    predictions = [None] * len(texts)
+    device = next(model.parameters()).device
+    model.eval()
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        encoded = tokenizer([texts[i] for i in batch], max_length=max_input_length, truncation=True, padding=True, return_tensors="pt")
+        inputs = {name: encoded[name].to(device) for name in ("input_ids", "attention_mask")}
+        with torch.inference_mode():
+            output_ids = model.generate(**inputs, num_beams=num_beams, max_new_tokens=max_new_tokens,
+                                        early_stopping=num_beams > 1, **generate_kwargs)
+        for i, text in zip(batch, tokenizer.batch_decode(output_ids, skip_special_tokens=True)):
+            predictions[i] = text.strip()
+    return predictions
+
+
+# ---------------- METRICS ---------------- #
+def _count_matrices(predictions, references, tokenize):
+    """Sparse token-count matrices (one row per text) over a shared vocabulary"""
+    from scipy.sparse import csr_matrix
+
+    vocabulary = {}
+    rows = []
+    for texts in (predictions, references):
+        indptr, indices = [0], []
+        for text in texts:
+            indices.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokenize(text))
+            indptr.append(len(indices))
+        rows.append((indptr, indices))
+
+    matrices = []
+    for texts, (indptr, indices) in zip((predictions, references), rows):
+        matrix = csr_matrix((np.ones(len(indices)), indices, indptr), shape=(len(texts), max(len(vocabulary), 1)))
+        matrix.sum_duplicates()   # Repeated tokens become counts
+        matrices.append(matrix)
+    return matrices
+
+
+def _rouge_tokens(text):
+    """rouge_score's default tokenization: lowercase alphanumeric runs"""
+    return _ROUGE_TOKEN.sub(" ", text.lower()).split()
+
+
+def _f1(overlap, predicted, reference):
+    precision = np.divide(overlap, predicted, out=np.zeros_like(overlap), where=predicted > 0)
+    recall = np.divide(overlap, reference, out=np.zeros_like(overlap), where=reference > 0)
+    total = precision + recall
+    return np.divide(2 * precision * recall, total, out=np.zeros_like(overlap), where=total > 0)
+
+
+def bleu1_scores(predictions, references):
+    """
+    Sentence BLEU-1 on whitespace tokens, matching nltk's sentence_bleu with
+    weights (1, 0, 0, 0) as used in the evaluation notebook
+    """
+    pred, ref = _count_matrices(predictions, references, str.split)
+    clipped = np.asarray(pred.minimum(ref).sum(axis=1)).ravel()
+    pred_len = np.asarray(pred.sum(axis=1)).ravel()
+    ref_len = np.asarray(ref.sum(axis=1)).ravel()
+    safe_len = np.maximum(pred_len, 1)
+    brevity = np.where(pred_len >= ref_len, 1.0, np.exp(1 - ref_len / safe_len))
+    # nltk scores 0 whenever no unigram matches; smoothing only affects higher orders
+    return np.where(clipped > 0, brevity * clipped / safe_len, 0.0)
+
+
+def rouge1_scores(predictions, references):
+    """ROUGE-1 F-measure per pair"""
+    pred, ref = _count_matrices(predictions, references, _rouge_tokens)
+    overlap = np.asarray(pred.minimum(ref).sum(axis=1)).ravel()
+    return _f1(overlap, np.asarray(pred.sum(axis=1)).ravel(), np.asarray(ref.sum(axis=1)).ravel())
+
+
+def lcs_length(a, b):
+    """Longest common subsequence of two token lists, bit-parallel over b (Hyyro's algorithm)"""
+    if not a or not b:
+        return 0
+    masks = {}
+    for i, token in enumerate(b):
+        masks[token] = masks.get(token, 0) | (1 << i)
+    full = (1 << len(b)) - 1
+    v = full
+    for token in a:
+        u = v & masks.get(token, 0)
+        v = ((v + u) | (v - u)) & full
+    return len(b) - bin(v).count("1")
+
+
+def _lcs_chunk(pairs):
+    return [lcs_length(_rouge_tokens(p), _rouge_tokens(r)) for p, r in pairs]
+
+
+def rougeL_scores(predictions, references, workers=1):
+    """ROUGE-L F-measure per pair; LCS runs in worker processes when workers > 1"""
+    pairs = list(zip(predictions, references))
+    if workers > 1 and len(pairs) > 1000:
+        size = math.ceil(len(pairs) / workers)
+        with ProcessPoolExecutor(workers) as pool:
+            lcs = [n for chunk in pool.map(_lcs_chunk, [pairs[i:i + size] for i in range(0, len(pairs), size)]) for n in chunk]
+    else:
+        lcs = _lcs_chunk(pairs)
+    pred_len = np.array([len(_rouge_tokens(p)) for p in predictions], dtype=np.float64)
+    ref_len = np.array([len(_rouge_tokens(r)) for r in references], dtype=np.float64)
+    return _f1(np.array(lcs, dtype=np.float64), pred_len, ref_len)
+
+
+def cosine_scores(predictions, references, encoder=None, batch_size=64):
+    """Cosine similarity of sentence embeddings, one batched encoding pass per side"""
+    if encoder is None:
+        from model_registry import get_sentence_encoder
+        encoder = get_sentence_encoder()
+    pred = encoder.encode(predictions, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+    ref = encoder.encode(references, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+    return np.einsum("ij,ij->i", pred, ref)
+
+
+def score(predictions, references, metrics=METRICS, workers=1, encoder=None):
+    """Per-example scores for each requested metric, as arrays"""
+    scorers = {
+        "bleu1": lambda: bleu1_scores(predictions, references),
+        "rouge1": lambda: rouge1_scores(predictions, references),
+        "rougeL": lambda: rougeL_scores(predictions, references, workers=workers),
+        "cosine": lambda: cosine_scores(predictions, references, encoder=encoder),
+    }
+    return {metric: scorers[metric]() for metric in metrics}
+
+
+def summarize(scores):
+    """Mean of every metric"""
+    return {metric: float(np.mean(values)) if len(values) else 0.0 for metric, values in scores.items()}
+
+
+# ---------------- CHECKPOINTS ---------------- #
+def load_checkpoint(model_name_or_path):
+    """(model, tokenizer) of a seq2seq checkpoint, on GPU when available"""
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(model_name_or_path)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name_or_path)
+    return model.to("cuda" if torch.cuda.is_available() else "cpu"), tokenizer
+
+
+def evaluate_examples(model, tokenizer, examples, input_format="context", batch_size=16, num_beams=1, metrics=METRICS, workers=1, **generate_kwargs):
+    """Generate a question for every {"context", "question", "answer"} example and score it; returns (predictions, scores)"""
+    predictions = generate_predictions(model, tokenizer, model_inputs(examples, input_format), batch_size=batch_size,
+                                       num_beams=num_beams, **generate_kwargs)
+    return predictions, score(predictions, [e["question"] for e in examples], metrics=metrics, workers=workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a question-generation checkpoint with batched generation")
+    parser.add_argument("--model", required=True, help="Checkpoint directory or hub name")
+    parser.add_argument("--data", required=True, help="SQuAD/QuAC-style JSON")
+    parser.add_argument("--limit", type=int, default=1000, help="Examples sampled from the file (0 for all)")
+    parser.add_argument("--input-format", choices=["context", "highlight"], default="context")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--num-beams", type=int, default=1, help="1 for greedy decoding")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--metrics", nargs="+", choices=METRICS, default=METRICS)
+    parser.add_argument("--workers", type=int, default=1, help="Processes for ROUGE-L")
+    parser.add_argument("--output", help="CSV with every prediction and its scores")
+    args = parser.parse_args()
+
+    from quac_dataset import iter_qa_pairs, reservoir_sample
+    examples = list(iter_qa_pairs(args.data)) if args.limit == 0 else reservoir_sample(iter_qa_pairs(args.data), args.limit)
+    model, tokenizer = load_checkpoint(args.model)
+    predictions, scores = evaluate_examples(model, tokenizer, examples, input_format=args.input_format, batch_size=args.batch_size,
+                                            num_beams=args.num_beams, metrics=args.metrics, workers=args.workers,
+                                            max_new_tokens=args.max_new_tokens)
+
+    print(f"Examples: {len(examples)}")
+    for metric, value in summarize(scores).items():
+        print(f"  {metric}: {value:.4f}")
+    if args.output:
+        import csv
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["prediction", "reference", *scores])
+            for i, (prediction, example) in enumerate(zip(predictions, examples)):
+                writer.writerow([prediction, example["question"], *(round(float(values[i]), 4) for values in scores.values())])
+        print(f"Scores saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
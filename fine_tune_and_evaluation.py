@@ -1,11 +1,11 @@
 from transformers import BartTokenizer, BartForConditionalGeneration, TrainingArguments, Trainer
-import pandas as pd
-from datasets import Dataset, Features, Value
 import evaluate
 import nltk
-import json
 import os
-import random
+import numpy as np
+from quac_dataset import tokenized_splits
+from training_utils import TokenCountingCollator, TokenThroughputCallback, fast_training_kwargs
+from evaluation import generate_predictions, score, summarize
 
 nltk.download('punkt')
 
@@ -13,44 +13,18 @@ nltk.download('punkt')
 train_file = r"C:/Users/aditi/OneDrive/Desktop/train_v0.2 QuaC.json"
 model_name = "voidful/bart-eqg-question-generator"
 output_dir = "./bart-eqg-finetuned-500"
+sample_size = 500   # Q&A pairs drawn from the corpus; None uses all of them
+
+# Fast mode pads each batch to its longest example, groups similar lengths into batches and
+# accumulates gradients up to target_batch_size; False restores fixed 512/64 padding at batch size 2
+dynamic_padding = True
+train_batch_size = 8
+target_batch_size = 16
 
 # === FILE CHECK ===
 if not os.path.exists(train_file):
     raise FileNotFoundError(f"File not found at: {train_file}")
 
-# === LOAD DATA ===
-with open(train_file, 'r', encoding='utf-8') as f:
-    quac_data = json.load(f)
-
-# === EXTRACT 500 Q&A PAIRS ===
-data = []
-for item in quac_data.get("data", []):
-    for paragraph in item.get("paragraphs", []):
-        context = paragraph.get("context", "")
-        for qa in paragraph.get("qas", []):
-            question = qa.get("question", "")
-            answer = qa.get("answers", [{}])[0].get("text", "") if qa.get("answers") else ""
-            if context and question and answer:
-                data.append({"context": context, "question": question, "answer": answer})
-
-random.seed(42)
-random.shuffle(data)
-data = data[:500]
-
-# === CREATE DATASET ===
-df = pd.DataFrame(data)[["context", "question", "answer"]]
-features = Features({
-    "context": Value("string"),
-    "question": Value("string"),
-    "answer": Value("string")
-})
-dataset = Dataset.from_pandas(df, features=features)
-train_test_split = dataset.train_test_split(test_size=0.2, seed=42)
-train_dataset = train_test_split["train"]
-eval_dataset = train_test_split["test"]
-
-print(f"Train size: {len(train_dataset)} | Eval size: {len(eval_dataset)}")
-
 # === LOAD MODEL AND TOKENIZER ===
 try:
     tokenizer = BartTokenizer.from_pretrained(model_name)
@@ -58,27 +32,33 @@ try:
 except Exception as e:
     raise RuntimeError(f"Could not load model or tokenizer: {e}")
 
-# === PREPROCESS FUNCTION ===
-def preprocess(example):
-    input_text = example['context']
-    target_text = example['question']
-    model_inputs = tokenizer(input_text, max_length=512, truncation=True, padding="max_length")
-    labels = tokenizer(target_text, max_length=64, truncation=True, padding="max_length")["input_ids"]
-    model_inputs["labels"] = labels
-    return model_inputs
+# === STREAM, SAMPLE & TOKENIZE Q&A PAIRS ===
+# The JSON is read one article at a time and sampled in a single pass; tokenized splits are
+# cached as Arrow under outputs/tokenized/ and memory-mapped by later runs with the same settings
+tokenized_train_dataset, tokenized_eval_dataset = tokenized_splits(
+    train_file,
+    tokenizer,
+    sample_size=sample_size,
+    test_size=0.2,
+    seed=42,
+    max_input_length=512,
+    max_target_length=64,
+    padding=False if dynamic_padding else "max_length"
+)
 
-tokenized_train_dataset = train_dataset.map(preprocess, remove_columns=train_dataset.column_names, batched=True)
-tokenized_eval_dataset = eval_dataset.map(preprocess, remove_columns=eval_dataset.column_names, batched=True)
+print(f"Train size: {len(tokenized_train_dataset)} | Eval size: {len(tokenized_eval_dataset)}")
 
 # === METRIC COMPUTATION ===
+# Loaded once here rather than on every evaluation call
+bleu = evaluate.load("bleu")
+rouge = evaluate.load("rouge")
+
 def compute_metrics(eval_pred):
     preds, labels = eval_pred
+    labels = np.where(labels != -100, labels, tokenizer.pad_token_id)   # -100 marks label padding
     decoded_preds = tokenizer.batch_decode(preds, skip_special_tokens=True)
     decoded_labels = tokenizer.batch_decode(labels, skip_special_tokens=True)
 
-    bleu = evaluate.load("bleu")
-    rouge = evaluate.load("rouge")
-
     bleu_score = bleu.compute(predictions=decoded_preds, references=decoded_labels)
     rouge_score = rouge.compute(predictions=decoded_preds, references=decoded_labels)
 
@@ -89,9 +69,10 @@ def compute_metrics(eval_pred):
     }
 
 # === TRAINING ARGS === (no evaluation_strategy used)
+batch_kwargs = fast_training_kwargs(train_batch_size, target_batch_size) if dynamic_padding else {"per_device_train_batch_size": 2}
 training_args = TrainingArguments(
     output_dir=output_dir,
-    per_device_train_batch_size=2,
+    **batch_kwargs,
     per_device_eval_batch_size=2,
     num_train_epochs=3,
     save_strategy="epoch",
@@ -103,12 +84,15 @@ training_args = TrainingArguments(
 )
 
 # === TRAINER ===
+collator = TokenCountingCollator(tokenizer, model)
 trainer = Trainer(
     model=model,
     args=training_args,
     train_dataset=tokenized_train_dataset,
     eval_dataset=tokenized_eval_dataset,
-    compute_metrics=compute_metrics
+    data_collator=collator,
+    compute_metrics=compute_metrics,
+    callbacks=[TokenThroughputCallback(collator)]
 )
 
 # === TRAIN & EVALUATE ===
@@ -119,8 +103,19 @@ trainer.train(resume_from_checkpoint=True)
 print("Running final evaluation...")
 results = trainer.evaluate()
 print("Final Evaluation Results:")
-for metric, score in results.items():
-    print(f"  {metric}: {score}")
+for metric, value in results.items():
+    print(f"  {metric}: {value}")
+
+# === GENERATION-BASED EVALUATION ===
+# Trainer.evaluate scores teacher-forced logits; this generates real questions in batches and scores them
+eval_inputs = tokenizer.batch_decode(tokenized_eval_dataset["input_ids"], skip_special_tokens=True)
+eval_references = tokenizer.batch_decode(
+    [[t for t in ids if t != -100] for ids in tokenized_eval_dataset["labels"]], skip_special_tokens=True
+)
+predictions = generate_predictions(model, tokenizer, eval_inputs, batch_size=16, num_beams=4, max_new_tokens=64)
+print("Generation Results:")
+for metric, value in summarize(score(predictions, eval_references)).items():
+    print(f"  {metric}: {value:.4f}")
 
 # === SAVE MODEL ===
 model.save_pretrained(os.path.join(output_dir, "final"))
@@ -1,34 +1,41 @@
 
 import random
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import sent_tokenize, word_tokenize
-from transformers import pipeline
+from model_registry import get_qa_model, get_qa_pipeline
+from qa_runner import QARunner
+from passage_index import needs_retrieval
+from document import as_document, digest_of, stop_words
+from quiz_cache import quiz_cache
+import tracing
 
 class AdvancedMCQGenerator:
-    def __init__(self):
-        nltk.download('punkt', quiet=True)
-        nltk.download('stopwords', quiet=True)
-        
-        # Initialize NLP models
-        self.qa_pipeline = pipeline("question-answering")
-        self.stop_words = set(stopwords.words('english'))
+    def __init__(self, distractor_mode='random', cache=quiz_cache, max_concepts=5):
+        # Initialize NLP models (shared across generators and sessions, on the selected backend)
+        self.model, self.tokenizer = get_qa_model()
+        self.qa_runner = QARunner(self.model, self.tokenizer)
+        self.stop_words = stop_words()
+        self.distractor_mode = distractor_mode   # 'random' or 'semantic' (embedding-ranked)
+        self.cache = cache                       # Generated quizzes by document and settings; None disables
+        self.max_concepts = max_concepts         # Key concepts, so MCQs, per document; None keeps all (question-bank pools)
+
+    @property
+    def qa_pipeline(self):
+        """PyTorch QA pipeline, only loaded when the single-question fallback needs it"""
+        return get_qa_pipeline()
 
     def extract_key_concepts(self, context):
         """Extract key concepts and important phrases"""
-        # Tokenize sentences
-        sentences = sent_tokenize(context)
+        # Sentences and tokens come pre-computed on the Document
+        document = as_document(context)
         
         # Extract potential key concepts
         key_concepts = []
-        for sentence in sentences:
+        for sentence, content_words in zip(document.sentences, document.content_tokens):
             # Look for sentences with unique, meaningful content
-            words = word_tokenize(sentence)
-            filtered_words = [word.lower() for word in words if word.isalnum() and word.lower() not in self.stop_words and len(word) > 2]
+            filtered_words = [word.lower() for word in content_words if word.isalnum() and len(word) > 2]
             # Prioritize sentences with named entities or specific concepts
             if len(filtered_words) > 3:
                 key_concepts.append(sentence)
-        return key_concepts[:5]  # Return top 5 key concepts
+        return key_concepts[:self.max_concepts]  # Return top key concepts (5 by default)
 
     def generate_intelligent_question(self, concept, context, difficulty):
             if difficulty == 'easy':
@@ -59,48 +66,83 @@ class AdvancedMCQGenerator:
 
     def generate_contextual_distractors(self, correct_answer, context, difficulty):
         """Create semantically related but incorrect distractors"""
-        sentences = sent_tokenize(context)
-        distractors = []
-        potential_distractors = [sent for sent in sentences if correct_answer.lower() not in sent.lower() and len(sent.split()) > 3]
-        fallback_distractors = ["A partially related historical context","An alternative interpretation","A peripheral aspect of the main theme"]
-        # Generating diverse distractors
-        while len(distractors) < 3:
-            if potential_distractors:
-                distractor = random.choice(potential_distractors)
-                potential_distractors.remove(distractor)
-                words = word_tokenize(distractor)
-                if difficulty == 'easy':
-                    phrase = ' '.join([w for w in words if w.lower() not in self.stop_words][:2])
-                elif difficulty == 'hard':
-                    phrase = ' '.join([w for w in words if w.lower() not in self.stop_words][:5])
-                else:  # medium
-                    phrase = ' '.join([w for w in words if w.lower() not in self.stop_words][:3])
-                distractors.append(phrase.strip())
+        document = as_document(context)
+        if self.distractor_mode == 'semantic':
+            from semantic_distractors import SemanticDistractorRanker
+            return SemanticDistractorRanker(document).draw(correct_answer, difficulty)
+        # Candidates are precomputed once per document and drawn from an indexed pool
+        return document.distractor_pool().draw(correct_answer, difficulty)
+
+    def answer_questions(self, questions, context, batch_size=8, top_k=3):
+        """Answer all questions as padded batches, from one cached encoding or, for long texts, each question's top-k passages"""
+        if not questions:
+            return []
+        document = as_document(context)
+        try:
+            if needs_retrieval(len(document)):
+                contexts = self.qa_runner.contexts_for(questions, document.passage_index(), top_k=top_k)
             else:
-                distractors.append(random.choice(fallback_distractors))
-        return distractors
+                contexts = self.qa_runner.encode(document.text)
+            return self.qa_runner.answer(questions, contexts, batch_size=batch_size)
+        except Exception as e:
+            if not getattr(self.qa_runner, "local_fallback", True):   # e.g. the quiz service's batching runner
+                raise
+            print(f"Batched QA failed, answering one question at a time: {e}")
+
+        # Fall back to single calls so one bad question does not sink the whole batch
+        results = []
+        for question in questions:
+            try:
+                results.append(self.qa_pipeline(question=question, context=document.text))
+            except Exception as e:
+                print(f"Error answering question: {e}")
+                results.append(None)
+        return results
 
-    def generate_mcq(self, context, num_questions=3, difficulty='medium'):
-        """Generate Multiple Choice Questions"""
+    def generate_mcq(self, context, num_questions=3, difficulty='medium', batch_size=8, top_k=3):
+        """Generate Multiple Choice Questions from raw text or a Document"""
         # Validate context
-        if not context or len(context.split()) < 30:
+        if not context:
+            raise ValueError("Context is too short. Provide more detailed text.")
+
+        # Repeat requests for the same document and settings are served from the cache
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(digest_of(context), 'mcq', difficulty, num_questions, self.model.name_or_path, self.distractor_mode, top_k, self.max_concepts)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                tracing.count("quiz_cache_hits")
+                return cached
+
+        document = as_document(context)   # Tokenize once for concepts, QA and distractors
+        if len(document) < 30:
             raise ValueError("Context is too short. Provide more detailed text.")
         
         mcq_questions = []
-        key_concepts = self.extract_key_concepts(context)
+        with tracing.span("key_concepts"):
+            key_concepts = self.extract_key_concepts(document)
         
-        for concept in key_concepts[:num_questions]:
+        # Build every templated question first, then answer them in one batched pass
+        questions = [self.generate_intelligent_question(concept, document.text, difficulty) for concept in key_concepts[:num_questions]]
+        with tracing.span("qa_inference"):
+            answer_results = self.answer_questions(questions, document, batch_size=batch_size, top_k=top_k)
+
+        for question, answer_result in zip(questions, answer_results):
+            if answer_result is None:
+                continue
             try:
-                question = self.generate_intelligent_question(concept, context, difficulty)
-                answer_result = self.qa_pipeline(question=question, context=context)
                 correct_answer = answer_result['answer']
-                distractors = self.generate_contextual_distractors(correct_answer, context, difficulty)
+                with tracing.span("distractors"):
+                    distractors = self.generate_contextual_distractors(correct_answer, document, difficulty)
                 all_options = [correct_answer] + distractors
                 random.shuffle(all_options)
                 correct_index = all_options.index(correct_answer)  # Determine correct option index
                 mcq_questions.append({"question": question,"options": all_options,"correct_answer": correct_index})     # Create MCQ
             except Exception as e:
                 print(f"Error generating question: {e}")
+        if cache_key is not None and mcq_questions:
+            self.cache.put(cache_key, mcq_questions)
+        tracing.count("questions_generated", len(mcq_questions))
         return mcq_questions
 def main():
     # Create generator instance
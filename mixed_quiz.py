@@ -0,0 +1,91 @@
+# mixed_quiz.py
+"""
+Mixed quizzes: MCQ, short-answer and true/false sections from one request.
+
+All sections share one Document (parsed once), and each section runs on its
+own thread. PyTorch releases the GIL inside its kernels, so the QA and NLI
+forward passes of different sections overlap and the quiz takes about as
+long as its slowest section rather than the sum of all three.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from document import as_document
+from passage_index import needs_retrieval
+from quiz_cache import quiz_cache
+import tracing
+
+SECTIONS = ["mcq", "short_answer", "true_false"]
+
+
+def generate_section(generator, question_type, document, count, difficulty):
+    """One section from the generator of its question type"""
+    if question_type == "mcq":
+        return generator.generate_mcq(document, num_questions=count, difficulty=difficulty)
+    if question_type == "short_answer":
+        return generator.generate_questions(document, num_questions=count, difficulty=difficulty)
+    return generator.generate_statements(document, count, difficulty)
+
+
+class MixedQuizGenerator:
+    """
+    Generates several question types concurrently. Generators are created on
+    first use (their models come from the shared registry) with the given quiz
+    cache (None disables) and MCQ concept cap, or can be passed in.
+    """
+    def __init__(self, generators=None, distractor_mode='random', cache=quiz_cache, max_concepts=5):
+        self.generators = dict(generators or {})
+        self.distractor_mode = distractor_mode
+        self.cache = cache
+        self.max_concepts = max_concepts
+
+    def generator(self, question_type):
+        if question_type not in self.generators:
+            if question_type == "mcq":
+                from mcq_generator import AdvancedMCQGenerator
+                self.generators[question_type] = AdvancedMCQGenerator(distractor_mode=self.distractor_mode, cache=self.cache,
+                                                                       max_concepts=self.max_concepts)
+            elif question_type == "short_answer":
+                from short_answer_generator import QuestionGenerator
+                self.generators[question_type] = QuestionGenerator(cache=self.cache)
+            else:
+                from truefalse_quiz import generate_true_false
+                self.generators[question_type] = generate_true_false(cache=self.cache)
+        return self.generators[question_type]
+
+    def _prepare(self, document, question_types):
+        """Build the parts of the Document that several sections read, before the threads start"""
+        if "mcq" in question_types:
+            document.content_tokens
+        if {"mcq", "short_answer"} <= set(question_types) and needs_retrieval(len(document)):
+            document.passage_index()
+
+    def generate(self, context, counts, difficulty='medium'):
+        """
+        counts maps question type -> number of questions. Returns (sections,
+        errors): questions per type in SECTIONS order, and the error message of
+        every section that failed, so one failing section does not sink the quiz.
+        """
+        document = as_document(context)
+        question_types = [question_type for question_type in SECTIONS if counts.get(question_type)]
+        sections, errors = {}, {}
+        if not question_types:
+            return sections, errors
+        with tracing.span("mixed_quiz"):
+            self._prepare(document, question_types)
+            parent = tracing.current()
+            with ThreadPoolExecutor(max_workers=len(question_types), thread_name_prefix="mixed-quiz") as pool:
+                futures = {
+                    question_type: pool.submit(self._run, parent, question_type, document, counts[question_type], difficulty)
+                    for question_type in question_types
+                }
+                for question_type, future in futures.items():
+                    try:
+                        sections[question_type] = future.result()
+                    except Exception as e:
+                        errors[question_type] = str(e)
+        return sections, errors
+
+    def _run(self, parent, question_type, document, count, difficulty):
+        with tracing.branch(parent, f"section_{question_type}"):
+            # Created on the section's thread, so first-use model loads overlap too
+            generator = self.generator(question_type)
+            return generate_section(generator, question_type, document, count, difficulty)
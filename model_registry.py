@@ -0,0 +1,192 @@
+# model_registry.py
+import os
+import sys
+import threading
+import time
+import weakref
+import tracing
+
+# Model names used across the generators
+DEFAULT_QA_MODEL = None  # transformers' default question-answering checkpoint
+DEFAULT_QA_CHECKPOINT = "distilbert/distilbert-base-cased-distilled-squad"  # What that default resolves to
+NLI_MODEL = "facebook/bart-large-mnli"
+SENTENCE_ENCODER_MODEL = "sentence-transformers/all-mpnet-base-v2"
+
+# Models that have not been requested for this long are dropped from the registry
+DEFAULT_MAX_IDLE_SECONDS = 30 * 60
+
+# Inference backend for the QA and NLI models: "torch" (eager fp32) or "onnx" (quantized int8, CPU)
+INFERENCE_BACKEND = os.environ.get("QUIZ_INFERENCE_BACKEND", "torch")
+
+
+class ModelRegistry:
+    """
+    Process-wide store of loaded pipelines and encoders.
+    Each (task, model) pair is loaded lazily on first use and the same instance
+    is handed to every generator and Streamlit session afterwards. Idle models
+    are released by a throttled sweep on every request and by a background
+    thread, so a process that stops asking for a model still frees it.
+    """
+    def __init__(self, max_idle_seconds=DEFAULT_MAX_IDLE_SECONDS):
+        self.max_idle_seconds = max_idle_seconds
+        self._entries = {}      # key -> [model, last_used]
+        self._key_locks = {}    # key -> lock held while that model loads
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self._sweeper = None
+
+    def get_pipeline(self, task, model=None, **kwargs):
+        """Return the shared pipeline for (task, model), loading it on first use"""
+        key = (task, model, tuple(sorted(kwargs.items())))
+        return self.get(key, lambda: _load_pipeline(task, model, **kwargs))
+
+    def get(self, key, loader):
+        """Return the shared object stored under key = (task, model, options), calling loader() on first use"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] = time.monotonic()
+            else:
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+        if entry is not None:
+            self._sweep()
+            return entry[0]
+
+        # Load outside the registry lock so other models stay available meanwhile
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry[1] = time.monotonic()
+                    return entry[0]
+            with tracing.span("model_load"):
+                loaded = loader()
+            tracing.count("models_loaded")
+            with self._lock:
+                self._entries[key] = [loaded, time.monotonic()]
+                self._key_locks.pop(key, None)
+        self._start_sweeper()
+        self._sweep()
+        return loaded
+
+    def _sweep_interval(self):
+        return min(60.0, self.max_idle_seconds / 2)
+
+    def _sweep(self):
+        """release_idle(), at most once per sweep interval"""
+        if self.max_idle_seconds is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep < self._sweep_interval():
+                return
+            self._last_sweep = now
+        self.release_idle()
+
+    def _start_sweeper(self):
+        """Daemon thread releasing idle models while no request comes in; it ends with the registry"""
+        if self._sweeper is not None or self.max_idle_seconds is None:
+            return
+        owner, interval = weakref.ref(self), self._sweep_interval()
+
+        def sweep():
+            while True:
+                time.sleep(interval)
+                registry = owner()
+                if registry is None:
+                    return
+                registry.release_idle()
+                del registry
+        self._sweeper = threading.Thread(target=sweep, name="model-registry-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def release_idle(self, max_idle_seconds=None):
+        """Drop models that have not been requested recently; returns how many were released"""
+        max_idle = self.max_idle_seconds if max_idle_seconds is None else max_idle_seconds
+        if max_idle is None:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            stale = [key for key, (_, last_used) in self._entries.items() if now - last_used > max_idle]
+            for key in stale:
+                del self._entries[key]
+        if stale:
+            _free_device_memory()
+        return len(stale)
+
+    def clear(self):
+        """Drop every loaded model"""
+        with self._lock:
+            self._entries.clear()
+        _free_device_memory()
+
+    def loaded(self):
+        """List the (task, model) pairs currently held"""
+        with self._lock:
+            return [(task, model) for task, model, _ in self._entries]
+
+
+def _device():
+    import torch
+    return 0 if torch.cuda.is_available() else -1
+
+
+def _load_pipeline(task, model=None, **kwargs):
+    from transformers import pipeline
+    kwargs.setdefault("device", _device())
+    if model is None:
+        return pipeline(task, **kwargs)
+    return pipeline(task, model=model, **kwargs)
+
+
+def _free_device_memory():
+    import gc
+    gc.collect()
+    torch = sys.modules.get("torch")   # Nothing to empty if torch was never loaded; importing it here would take seconds
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+# ---------------- SHARED REGISTRY ---------------- #
+registry = ModelRegistry()
+
+
+def get_qa_pipeline(model_name=DEFAULT_QA_MODEL):
+    """Shared question-answering pipeline"""
+    return registry.get_pipeline("question-answering", model_name)
+
+
+def get_nli_pipeline():
+    """Shared facebook/bart-large-mnli classifier used to grade true/false statements"""
+    return registry.get_pipeline("text-classification", NLI_MODEL)
+
+
+def get_qa_model(model_name=DEFAULT_QA_MODEL, backend=None):
+    """(model, tokenizer) for question answering on the selected inference backend"""
+    if (backend or INFERENCE_BACKEND) == "onnx":
+        return _get_onnx_model("question-answering", model_name or DEFAULT_QA_CHECKPOINT)
+    qa_pipeline = get_qa_pipeline(model_name)
+    return qa_pipeline.model, qa_pipeline.tokenizer
+
+
+def get_nli_model(backend=None):
+    """(model, tokenizer) for facebook/bart-large-mnli on the selected inference backend"""
+    if (backend or INFERENCE_BACKEND) == "onnx":
+        return _get_onnx_model("text-classification", NLI_MODEL)
+    nli = get_nli_pipeline()
+    return nli.model, nli.tokenizer
+
+
+def _get_onnx_model(task, model_name):
+    def load():
+        from onnx_backend import load_quantized
+        return load_quantized(task, model_name)
+    return registry.get((task, model_name, (("backend", "onnx"),)), load)
+
+
+def get_sentence_encoder(model_name=SENTENCE_ENCODER_MODEL):
+    """Shared sentence-transformers encoder used for semantic distractors"""
+    def load():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name, device="cuda" if _device() == 0 else "cpu")
+    return registry.get(("sentence-embedding", model_name, ()), load)
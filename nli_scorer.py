@@ -0,0 +1,60 @@
+# nli_scorer.py
+import torch
+import tracing
+from model_registry import get_nli_model
+from document import as_document, text_of
+from passage_index import PassageIndex
+
+
+def classify_statements(context, statements, batch_size=8, trim_premise=False, premise_sentences=3):
+    """
+    Classify every statement against the context with facebook/bart-large-mnli
+    in padded batches. With trim_premise, each premise is cut down to the
+    premise_sentences context sentences most relevant to that statement.
+    Returns one {'label', 'score'} per statement, labels as the pipeline names them.
+    """
+    if not statements:
+        return []
+    premises = relevant_premises(context, statements, premise_sentences) if trim_premise else [text_of(context)] * len(statements)
+    return classify_pairs(premises, statements, batch_size=batch_size)
+
+
+def classify_pairs(premises, statements, batch_size=8):
+    """Classify (premise, statement) pairs in length-sorted, padded batches"""
+    if not statements:
+        return []
+    model, tokenizer = get_nli_model()
+
+    # Length-sorted batches keep padding to a minimum
+    order = sorted(range(len(statements)), key=lambda i: len(premises[i]) + len(statements[i]))
+    results = [None] * len(statements)
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        inputs = tokenizer(
+            [premises[i] for i in batch],
+            [statements[i] for i in batch],
+            padding=True,
+            truncation="only_first",
+            return_tensors="pt"
+        ).to(model.device)
+        with tracing.span("nli_inference"), torch.no_grad():
+            probs = model(**inputs).logits.softmax(dim=-1).cpu()
+        scores, labels = probs.max(dim=-1)
+        for i, score, label in zip(batch, scores.tolist(), labels.tolist()):
+            results[i] = {"label": model.config.id2label[label].lower(), "score": score}
+    tracing.count("nli_pairs", len(statements))
+    return results
+
+
+@tracing.traced("premise_selection")
+def relevant_premises(context, statements, premise_sentences=3):
+    """For each statement, the context sentences that best match it, kept in document order"""
+    document = as_document(context)
+    # One passage per sentence, so BM25 ranks individual sentences
+    index = PassageIndex(document.text, max_words=0, sentences=document.sentences, sentence_offsets=document.sentence_offsets)
+    premises = []
+    for statement in statements:
+        best = sorted(index.search(statement, premise_sentences))
+        premises.append(" ".join(index.passages[i] for i in best))
+    return premises
+
@@ -0,0 +1,46 @@
+# nltk_resources.py
+"""
+NLTK data checks without network round-trips.
+
+Each resource is looked up in the local NLTK data path once per process and
+only downloaded when it is missing (e.g. on a fresh machine). Set
+QUIZ_NLTK_DOWNLOAD=0 to fail fast instead of downloading, e.g. on servers
+whose image ships the data.
+"""
+import os
+import re
+import threading
+
+# Resource name -> path inside nltk_data
+RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab",
+    "stopwords": "corpora/stopwords",
+}
+
+_ready = set()
+_lock = threading.Lock()
+
+
+def sentence_tokenizer():
+    """The Punkt resource sent_tokenize loads: punkt_tab for NLTK >= 3.8.2, the pickled punkt before that"""
+    import nltk
+    version = tuple(int(part) for part in re.findall(r"\d+", nltk.__version__)[:3])
+    return "punkt_tab" if version >= (3, 8, 2) else "punkt"
+
+
+def ensure(*names):
+    """Make sure the named resources are available locally, downloading only those that are missing"""
+    missing = [name for name in names if name not in _ready]
+    if not missing:
+        return
+    import nltk
+    with _lock:
+        for name in missing:
+            try:
+                nltk.data.find(RESOURCES[name])
+            except LookupError:
+                if os.environ.get("QUIZ_NLTK_DOWNLOAD", "1") == "0":
+                    raise LookupError(f"NLTK resource '{name}' is not installed; run: python -m nltk.downloader {name}")
+                nltk.download(name, quiet=True)
+            _ready.add(name)
@@ -0,0 +1,183 @@
+# onnx_backend.py
+import argparse
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+import numpy as np
+import torch
+
+ONNX_DIR = os.path.join("outputs", "onnx")
+OPSET_VERSION = 17
+
+# Output heads exported for each task
+TASK_OUTPUTS = {
+    "question-answering": ["start_logits", "end_logits"],
+    "text-classification": ["logits"],
+}
+
+
+def _model_class(task):
+    from transformers import AutoModelForQuestionAnswering, AutoModelForSequenceClassification
+    return AutoModelForQuestionAnswering if task == "question-answering" else AutoModelForSequenceClassification
+
+
+def artifact_dir(task, model_name, directory=ONNX_DIR):
+    return os.path.join(directory, task, model_name.replace("/", "--"))
+
+
+def export_quantized(task, model_name, directory=ONNX_DIR):
+    """
+    Export a transformers model to ONNX once, apply dynamic int8 quantization
+    and keep the quantized graph, tokenizer and config on disk.
+    Returns the artifact directory; existing artifacts are reused. Processes
+    exporting the same model at once (e.g. batch_generate workers) take turns
+    on a file lock, and each export is built in a scratch directory that is
+    renamed into place when complete, so a crashed or concurrent export never
+    leaves a partial artifact behind.
+    """
+    from filelock import FileLock
+
+    target = artifact_dir(task, model_name, directory)
+    quantized_path = os.path.join(target, "model.int8.onnx")
+    if os.path.exists(quantized_path):
+        return target
+    parent = os.path.dirname(target)
+    os.makedirs(parent, exist_ok=True)
+    with FileLock(target + ".lock"):
+        if os.path.exists(quantized_path):   # Exported by another process while we waited
+            return target
+        scratch = tempfile.mkdtemp(dir=parent, prefix=os.path.basename(target) + ".")
+        os.chmod(scratch, 0o755)   # mkdtemp makes it private; the artifact is a shared cache
+        try:
+            _export_into(task, model_name, scratch)
+            if os.path.exists(target):
+                shutil.rmtree(target)   # Incomplete leftover of an export from before the rename
+            os.replace(scratch, target)
+        except BaseException:
+            shutil.rmtree(scratch, ignore_errors=True)
+            raise
+    return target
+
+
+def _export_into(task, model_name, target):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = _model_class(task).from_pretrained(model_name).eval()
+    model.config.return_dict = True
+    sample = tokenizer(["What is exported?"], ["The model is exported to ONNX."], return_tensors="pt")
+    input_names = [name for name in tokenizer.model_input_names if name in sample]
+    output_names = TASK_OUTPUTS[task]
+    axes = {0: "batch", 1: "sequence"}
+
+    float_path = os.path.join(target, "model.onnx")
+    torch.onnx.export(
+        model,
+        args=(),
+        kwargs={name: sample[name] for name in input_names},
+        f=float_path,
+        input_names=input_names,
+        output_names=output_names,
+        dynamic_axes={name: axes for name in input_names + output_names},
+        opset_version=OPSET_VERSION,
+        dynamo=False
+    )
+    quantize_dynamic(float_path, os.path.join(target, "model.int8.onnx"), weight_type=QuantType.QInt8)
+    os.remove(float_path)
+    tokenizer.save_pretrained(target)
+    model.config.save_pretrained(target)
+
+
+class OnnxModel:
+    """
+    ONNX Runtime session with the calling convention the QA runner and NLI scorer
+    use on transformers models: model(**tensors) returns start/end logits or logits.
+    """
+    def __init__(self, directory, name_or_path):
+        import onnxruntime as ort
+        from transformers import AutoConfig
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(os.path.join(directory, "model.int8.onnx"), options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.output_names = [node.name for node in self.session.get_outputs()]
+        self.config = AutoConfig.from_pretrained(directory)
+        self.name_or_path = f"{name_or_path}:onnx-int8"   # Keeps caches apart from the PyTorch backend
+        self.device = torch.device("cpu")
+
+    def __call__(self, **inputs):
+        feed = {name: tensor.cpu().numpy().astype(np.int64) for name, tensor in inputs.items() if name in self.input_names}
+        outputs = self.session.run(self.output_names, feed)
+        return SimpleNamespace(**{name: torch.from_numpy(value) for name, value in zip(self.output_names, outputs)})
+
+    def eval(self):
+        return self
+
+
+def load_quantized(task, model_name, directory=ONNX_DIR):
+    """(OnnxModel, tokenizer) for the model, exporting it first if needed"""
+    from transformers import AutoTokenizer
+    target = export_quantized(task, model_name, directory)
+    return OnnxModel(target, model_name), AutoTokenizer.from_pretrained(target)
+
+
+def compare_backends(task, model_name, pairs, directory=ONNX_DIR):
+    """
+    Accuracy check of the quantized ONNX model against the PyTorch model on
+    (first, second) text pairs: question/context for QA, premise/hypothesis for NLI.
+    Reports the largest logit difference and how often the predictions agree.
+    """
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    torch_model = _model_class(task).from_pretrained(model_name).eval()
+    onnx_model, _ = load_quantized(task, model_name, directory)
+
+    inputs = tokenizer([a for a, _ in pairs], [b for _, b in pairs], padding=True, truncation=True, return_tensors="pt")
+    inputs = {name: inputs[name] for name in tokenizer.model_input_names if name in inputs}
+    with torch.no_grad():
+        expected = torch_model(**inputs)
+    actual = onnx_model(**inputs)
+
+    report = {"samples": len(pairs), "max_abs_diff": 0.0}
+    agreements = []
+    for name in TASK_OUTPUTS[task]:
+        want, got = getattr(expected, name).float(), getattr(actual, name).float()
+        mask = inputs["attention_mask"].bool() if task == "question-answering" else torch.ones_like(want, dtype=torch.bool)
+        report["max_abs_diff"] = max(report["max_abs_diff"], float((want - got).abs()[mask].max()))
+        agreements.append((want.argmax(dim=-1) == got.argmax(dim=-1)).float())
+    report["agreement"] = float(torch.stack(agreements).min(dim=0).values.mean())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export quantized ONNX models and check them against PyTorch")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--task", choices=sorted(TASK_OUTPUTS), default="question-answering")
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--dir", default=ONNX_DIR)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(f"Quantized model saved to {export_quantized(args.task, args.model, args.dir)}")
+        return
+    if args.task == "question-answering":
+        pairs = [
+            ("Who wrote the novel?", "The novel was written by Jane Austen in 1813 and published in London."),
+            ("How many planets orbit the Sun?", "Eight planets orbit the Sun in elliptical paths."),
+            ("What do plants need to make energy?", "Plants use light and water to make energy in their cells."),
+        ]
+    else:
+        pairs = [
+            ("Eight planets orbit the Sun.", "Eight planets orbit the Sun."),
+            ("Eight planets orbit the Sun.", "Ten planets orbit the Sun."),
+            ("Plants use light to make energy.", "Plants make energy without light."),
+        ]
+    report = compare_backends(args.task, args.model, pairs, args.dir)
+    print(f"Samples: {report['samples']} | max |logit diff|: {report['max_abs_diff']:.4f} | prediction agreement: {report['agreement']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
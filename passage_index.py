@@ -0,0 +1,98 @@
+# passage_index.py
+import math
+import re
+from collections import Counter, defaultdict
+from nltk.tokenize import sent_tokenize
+import nltk_resources
+
+# Documents longer than this are answered from their top passages instead of in full
+RETRIEVAL_MIN_WORDS = 800
+
+_TERM = re.compile(r"\w+")
+
+
+def terms(text):
+    return _TERM.findall(text.lower())
+
+
+class PassageIndex:
+    """
+    BM25 index over sentence-aligned passages of one document.
+    Built once per document; each question is then answered from its
+    top-k passages so QA cost stays flat as the document grows.
+    """
+    def __init__(self, text, max_words=120, k1=1.5, b=0.75, sentences=None, sentence_offsets=None):
+        self.text = text
+        self.k1 = k1
+        self.b = b
+        if sentences is None:
+            sentences, sentence_offsets = split_sentences(text)
+        self.passages, self.starts = self._chunk(text, sentences, sentence_offsets, max_words)
+        self.encodings = {}     # (tokenizer, window length, stride, passage id) -> EncodedContext, filled by QARunner.contexts_for
+
+        # Inverted index: term -> {passage id: term frequency}
+        self.postings = defaultdict(dict)
+        self.lengths = []
+        for passage_id, passage in enumerate(self.passages):
+            counts = Counter(terms(passage))
+            self.lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                self.postings[term][passage_id] = count
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        self.idf = {
+            term: math.log(1 + (len(self.passages) - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    @staticmethod
+    def _chunk(text, sentences, sentence_offsets, max_words):
+        """Group consecutive sentences into passages of about max_words, keeping their offsets"""
+        passages, starts = [], []
+        current_start, current_end, current_words = None, 0, 0
+        for sentence, start in zip(sentences, sentence_offsets):
+            words = len(sentence.split())
+            if current_start is not None and current_words + words > max_words:
+                passages.append(text[current_start:current_end])
+                starts.append(current_start)
+                current_start, current_words = None, 0
+            if current_start is None:
+                current_start = start
+            current_end = start + len(sentence)
+            current_words += words
+        if current_start is not None:
+            passages.append(text[current_start:current_end])
+            starts.append(current_start)
+        return passages, starts
+
+    def search(self, query, k=3):
+        """Ids of the k best passages for the query, best first"""
+        scores = defaultdict(float)
+        for term in set(terms(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for passage_id, count in self.postings[term].items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[passage_id] / self.avg_length)
+                scores[passage_id] += idf * count * (self.k1 + 1) / (count + norm)
+        if not scores:
+            return list(range(min(k, len(self.passages))))
+        return sorted(scores, key=scores.get, reverse=True)[:k]
+
+
+def split_sentences(text):
+    """Sentences of text with the character offset where each one starts"""
+    nltk_resources.ensure(nltk_resources.sentence_tokenizer())
+    sentences = sent_tokenize(text)
+    offsets = []
+    position = 0
+    for sentence in sentences:
+        start = text.find(sentence, position)
+        if start < 0:
+            start = position
+        offsets.append(start)
+        position = start + len(sentence)
+    return sentences, offsets
+
+
+def needs_retrieval(num_words):
+    return num_words > RETRIEVAL_MIN_WORDS
@@ -0,0 +1,156 @@
+# pdf_extraction.py
+"""
+PDF text extraction with a per-file cache and page-range selection.
+
+Page texts are extracted once per file (keyed by the SHA-256 of its bytes),
+kept in memory for the running process and written as JSON under
+outputs/pdf_text/, so Streamlit reruns and later sessions never re-parse an
+upload. Large PDFs are split into contiguous page ranges and extracted in
+worker processes; the selected pages are joined in one pass.
+
+    python pdf_extraction.py lecture.pdf --pages "1-10, 15" --workers 4
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from quiz_cache import LRUCache, write_json
+import tracing
+
+PDF_TEXT_DIR = os.path.join("outputs", "pdf_text")
+PARALLEL_MIN_PAGES = 64     # Smaller files are extracted in-process; worker start-up would dominate
+
+_RANGE = re.compile(r"^(\d*)\s*-\s*(\d*)$")
+
+
+# ---------------- PAGE RANGES ---------------- #
+def parse_page_ranges(spec, page_count):
+    """
+    0-based page indices for a 1-based spec such as "1-5, 8, 10-" (open ends
+    run to the first/last page). An empty spec selects every page.
+    """
+    if not spec or not spec.strip():
+        return list(range(page_count))
+    pages = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        match = _RANGE.match(part)
+        if match:
+            first, last = int(match.group(1) or 1), int(match.group(2) or page_count)
+        elif part.isdigit():
+            first = last = int(part)
+        else:
+            raise ValueError(f"Invalid page range '{part}'; use e.g. 1-5, 8, 10-")
+        if first > last:
+            raise ValueError(f"Page range '{part}' runs backwards")
+        if not 1 <= first <= last <= page_count:
+            raise ValueError(f"Page range '{part}' is outside 1-{page_count}")
+        pages.extend(range(first - 1, last))
+    return list(dict.fromkeys(pages))   # Overlapping ranges keep each page once, in order
+
+
+def select_pages(page_texts, spec):
+    """Selected pages joined into one text"""
+    return "".join(page_texts[i] for i in parse_page_ranges(spec, len(page_texts)))
+
+
+# ---------------- EXTRACTION ---------------- #
+def _extract_range(data, start, stop):
+    """Texts of pages [start, stop) of a PDF given as bytes; runs in worker processes"""
+    import fitz
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+def _page_count(data):
+    import fitz
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return doc.page_count
+
+
+def extract_page_texts(data, workers=None):
+    """Text of every page, splitting large PDFs into one contiguous range per worker process"""
+    page_count = _page_count(data)
+    workers = min(workers or os.cpu_count() or 1, page_count)
+    if workers <= 1 or page_count < PARALLEL_MIN_PAGES:
+        return _extract_range(data, 0, page_count)
+    size = -(-page_count // workers)
+    bounds = [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+    # spawn: the Streamlit process may hold torch threads that a forked child must not inherit
+    with ProcessPoolExecutor(len(bounds), mp_context=multiprocessing.get_context("spawn")) as pool:
+        chunks = pool.map(_extract_range, [data] * len(bounds), *zip(*bounds))
+        return [text for chunk in chunks for text in chunk]
+
+
+class PDFTextCache:
+    """Page texts by file hash: recent files in memory, every file as JSON under outputs/pdf_text/"""
+    def __init__(self, max_entries=16, directory=PDF_TEXT_DIR):
+        self.memory = LRUCache(max_entries)
+        self.directory = directory
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def page_texts(self, data, workers=None):
+        """Text of every page of the PDF in data (bytes), extracted at most once per file"""
+        digest = hashlib.sha256(data).hexdigest()
+        pages = self.memory.get(digest)
+        if pages is None and self.directory and os.path.exists(self._path(digest)):
+            try:
+                with open(self._path(digest), "r", encoding="utf-8") as f:
+                    pages = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable PDF text cache entry {digest}: {e}")
+        if pages is not None:
+            tracing.count("pdf_text_cache_hits")
+            self.memory.put(digest, pages)
+            return pages
+
+        with tracing.span("pdf_parse"):
+            pages = extract_page_texts(data, workers)
+        self.memory.put(digest, pages)
+        if self.directory:
+            try:
+                write_json(self._path(digest), pages)
+            except OSError as e:
+                print(f"Could not write PDF text cache entry {digest}: {e}")
+        return pages
+
+    def clear(self):
+        self.memory.clear()
+
+
+pdf_text_cache = PDFTextCache()
+
+
+def extract_text(data, pages="", workers=None, cache=pdf_text_cache):
+    """Text of the selected pages (a spec such as "1-5, 8"; empty for all) of a PDF given as bytes"""
+    texts = cache.page_texts(data, workers) if cache is not None else extract_page_texts(data, workers)
+    return select_pages(texts, pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract (and cache) the text of a PDF")
+    parser.add_argument("pdf")
+    parser.add_argument("--pages", default="", help='1-based page ranges, e.g. "1-5, 8, 10-"')
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", help="Text file (default: stdout)")
+    args = parser.parse_args()
+
+    with open(args.pdf, "rb") as f:
+        text = extract_text(f.read(), args.pages, args.workers)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"{len(text)} characters saved to {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# perturbation.py
+"""
+Rule-table perturbation of sentences into false statements.
+
+Rules come from perturbation_rules.csv (kind, match, replace, levels): word
+and phrase rewrites for negation, antonyms, number words and fixed swaps,
+plus two built-in kinds enabled per level by the table: <digits> shifts
+numerals and <entity> swaps a capitalised name for another one from the same
+document with as many words, seen next to the same words ("in Germany" ->
+"in France", never "in Albert Einstein"). Every rule of a level is compiled into one regex alternation and
+run once over all the sentences of a document, so a long text yields its
+perturbation candidates in a single pass. verify_contradictions() checks
+candidates against their source sentences with batched NLI.
+"""
+import csv
+import hashlib
+import os
+import random
+import re
+from collections import Counter, namedtuple
+import tracing
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perturbation_rules.csv")
+LOGIC_REVISION = 3   # Bump when rules are applied differently, so cached true/false quizzes are regenerated
+DIGITS = "<digits>"
+ENTITY = "<entity>"
+
+Rule = namedtuple("Rule", "kind match replace levels")
+Perturbation = namedtuple("Perturbation", "text kind original replacement")
+
+_ENTITY = re.compile(r"\b[A-Z][a-z]+(?: [A-Z][a-z]+)*\b")   # Spaces only, so names never span two sentences
+_NUMBER = r"(?P<digits>\b\d+\b)"
+_WORD_BEFORE = re.compile(r"(\w+)\W*$")
+_WORD_AFTER = re.compile(r"\W*(\w+)")
+
+
+def load_rules(path=RULES_PATH):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return [Rule(row["kind"], row["match"], row["replace"], frozenset(row["levels"].split())) for row in csv.DictReader(f)]
+
+
+def shift_number(value):
+    """A different, plausible number: years move by a decade, small counts by two, the rest by half"""
+    if 1000 <= value <= 2100:
+        return value + 10
+    if value < 10:
+        return value + 2
+    return value + max(1, value // 2)
+
+
+def trie_pattern(words):
+    """
+    Regex alternation of words factored by common prefixes ("is|is not|isn't"
+    becomes "is(?:n't| not)?"), so the engine tries each character once
+    instead of every alternative in turn
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node):
+        ends = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends:
+            return (body if len(branches) == 1 and len(body) == 1 else f"(?:{body})") + "?"
+        return body
+
+    return build(trie)
+
+
+def _match_case(source, replacement):
+    return replacement[:1].upper() + replacement[1:] if source[:1].isupper() else replacement
+
+
+def neighbours(sentence, start, end):
+    """Lower-cased words right before and after sentence[start:end], tagged with their side"""
+    before = _WORD_BEFORE.search(sentence, 0, start)
+    after = _WORD_AFTER.match(sentence, end)
+    found = set()
+    if before:
+        found.add(("before", before.group(1).lower()))
+    if after:
+        found.add(("after", after.group(1).lower()))
+    return found
+
+
+def document_entities(sentences):
+    """
+    (names, contexts, related): capitalised names of the document by
+    frequency, ignoring the first word of each sentence, the neighbouring
+    words of every occurrence of each name, and the names each one shares a
+    sentence with
+    """
+    counts, contexts, related = Counter(), {}, {}
+    for sentence in sentences:
+        found = set()
+        for match in _ENTITY.finditer(sentence):
+            name = match.group(0)
+            if match.start() > 0:
+                counts[name] += 1
+            contexts.setdefault(name, set()).update(neighbours(sentence, match.start(), match.end()))
+            found.add(name)
+        for name in found:
+            related.setdefault(name, set()).update(found - {name})
+    return [name for name, _ in counts.most_common()], contexts, related
+
+
+class PerturbationEngine:
+    """Compiles the rule table per level and applies it to whole documents"""
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.version = hashlib.sha1(f"{LOGIC_REVISION}:{self.rules!r}".encode("utf-8")).hexdigest()[:12]   # Part of quiz cache keys
+        self._levels = {}
+
+    @classmethod
+    def from_table(cls, path=RULES_PATH):
+        return cls(load_rules(path))
+
+    def _level(self, level):
+        """(literal alternation source, {lowercased match: (kind, replacement)}, digits on, entities on) for a level"""
+        if level not in self._levels:
+            rules = [rule for rule in self.rules if level in rule.levels]
+            literals = {rule.match.lower(): (rule.kind, rule.replace) for rule in rules if rule.match not in (DIGITS, ENTITY)}
+            source = trie_pattern(literals)   # Greedy, so "is not" wins over "is"
+            self._levels[level] = (source, literals, any(rule.match == DIGITS for rule in rules),
+                                   any(rule.match == ENTITY for rule in rules))
+        return self._levels[level]
+
+    def has_rules(self, level):
+        source, _, digits, entities = self._level(level)
+        return bool(source or digits or entities)
+
+    def matcher(self, level, entities=()):
+        """One compiled pattern for every rule of the level (and the document's entities)"""
+        source, _, digits, use_entities = self._level(level)
+        parts = [f"(?P<literal>\\b(?i:{source})\\b)"] if source else []   # Rules match in any case, names only as written
+        if digits:
+            parts.append(_NUMBER)
+        if use_entities and len(entities) > 1:
+            parts.append("(?P<entity>\\b(?:" + "|".join(re.escape(name) for name in sorted(entities, key=len, reverse=True)) + ")\\b)")
+        return re.compile("|".join(parts)) if parts else None
+
+    def perturb_sentences(self, sentences, level, seed=42):
+        """
+        One Perturbation (or None when no rule applies) per sentence. All
+        sentences are scanned in a single pass; where several rules match a
+        sentence, one is picked with a seeded RNG.
+        """
+        if not self.has_rules(level):
+            return [None] * len(sentences)
+        _, literals, _, use_entities = self._level(level)
+        entities, contexts, related = document_entities(sentences) if use_entities else ([], {}, {})
+        pattern = self.matcher(level, entities)
+        rng = random.Random(seed)
+
+        with tracing.span("perturbation"):
+            joined = "\n".join(sentences)
+            starts, position = [], 0
+            for sentence in sentences:
+                starts.append(position)
+                position += len(sentence) + 1
+            matches = [[] for _ in sentences]
+            index = 0
+            for match in pattern.finditer(joined):
+                while index + 1 < len(starts) and starts[index + 1] <= match.start():
+                    index += 1
+                matches[index].append(match)
+
+            results = []
+            for sentence, start, candidates in zip(sentences, starts, matches):
+                rng.shuffle(candidates)
+                results.append(next((p for p in (self._apply(sentence, start, m, literals, entities, contexts, related, rng) for m in candidates) if p), None))
+        return results
+
+    def _apply(self, sentence, offset, match, literals, entities, contexts, related, rng):
+        original = match.group(0)
+        start, end = match.start() - offset, match.end() - offset
+        if match.lastgroup == "digits":
+            replacement = str(shift_number(int(original)))
+            kind = "number"
+        elif match.lastgroup == "entity":
+            # Same number of words and a shared neighbouring word, so a place is not swapped for a person.
+            # Names written together anywhere ("Paris is in France") are often both true of one fact, so they are skipped
+            here, words = neighbours(sentence, start, end), original.count(" ")
+            together = related.get(original, set())
+            others = [name for name in entities if name.count(" ") == words and name not in sentence and original not in name
+                      and name not in together and here & contexts.get(name, set())]
+            if not others:
+                return None
+            kind, replacement = "entity", rng.choice(others[:10])   # Among the document's most frequent names
+        else:
+            entry = literals.get(original.lower())
+            if entry is None:
+                return None
+            kind, replacement = entry
+        replacement = _match_case(original, replacement)
+        return Perturbation(sentence[:start] + replacement + sentence[end:], kind, original, replacement)
+
+    def perturb(self, sentence, level, seed=42):
+        """The sentence with one rule applied, or the sentence unchanged"""
+        perturbation = self.perturb_sentences([sentence], level, seed)[0]
+        return perturbation.text if perturbation else sentence
+
+
+def verify_contradictions(sentences, statements, batch_size=8):
+    """Whether the NLI model reads each statement as contradicting its source sentence, in batches"""
+    from nli_scorer import classify_pairs
+    with tracing.span("nli_verification"):
+        return [result["label"] == "contradiction" for result in classify_pairs(sentences, statements, batch_size=batch_size)]
+
+
+_default_engine = None
+
+
+def default_engine():
+    """Engine over the bundled rule table, loaded once per process"""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = PerturbationEngine.from_table()
+    return _default_engine
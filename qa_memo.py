@@ -0,0 +1,48 @@
+# qa_memo.py
+import re
+from quiz_cache import LRUCache
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question, lowercase=False):
+    """Question with whitespace collapsed; case is only folded for uncased models, where it cannot change the answer"""
+    question = _SPACES.sub(" ", question).strip()
+    return question.lower() if lowercase else question
+
+
+class QAMemo:
+    """
+    Bounded, process-wide memo of QA answers keyed by
+    (model, normalized question, context digest), with hit/miss counters.
+    Repeated templated questions, within a run or across runs on the same
+    document, skip the model entirely.
+    """
+    def __init__(self, max_entries=4096):
+        self.entries = LRUCache(max_entries)
+
+    @staticmethod
+    def key(model_name, question, context_digest, lowercase=False):
+        return (model_name, normalize_question(question, lowercase), context_digest)
+
+    def get(self, key):
+        answer = self.entries.get(key)
+        return dict(answer) if answer is not None else None
+
+    def put(self, key, answer):
+        self.entries.put(key, dict(answer))
+
+    @property
+    def hits(self):
+        return self.entries.hits
+
+    @property
+    def misses(self):
+        return self.entries.misses
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+
+# ---------------- SHARED MEMO ---------------- #
+qa_memo = QAMemo()
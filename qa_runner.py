@@ -0,0 +1,211 @@
+# qa_runner.py
+import hashlib
+import numpy as np
+import torch
+from qa_memo import QAMemo, qa_memo
+
+
+class EncodedContext:
+    """
+    A context tokenized once: token ids, character offsets and the overlapping
+    windows the QA model reads. Reused for every question asked about it.
+    """
+    def __init__(self, text, input_ids, offsets, windows, char_offset=0):
+        self.text = text
+        self.input_ids = input_ids
+        self.offsets = offsets          # (char_start, char_end) of the word each token belongs to
+        self.windows = windows          # (token_start, token_end) per window
+        self.char_offset = char_offset  # Position of text inside the full document
+        self.digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class QARunner:
+    """
+    Extractive QA over cached context encodings.
+    Mirrors the question-answering pipeline (stride, span scoring, word
+    alignment) but tokenizes each context only once, with windows sized for the
+    longest allowed question, then batches every (question, window) pair
+    through the model.
+    """
+    def __init__(self, model, tokenizer, max_length=384, doc_stride=128, max_question_length=64, max_answer_length=15, memo=qa_memo):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.memo = memo    # Shared answer memo; None disables
+        self.max_length = max_length
+        self.max_question_length = max_question_length
+        self.max_answer_length = max_answer_length
+        self.use_token_types = "token_type_ids" in tokenizer.model_input_names
+        self.uncased = bool(getattr(tokenizer, "do_lower_case", False))   # Memo keys fold case only when the model does
+
+        # Room left for context tokens once the question and special tokens are in place
+        self.window_length = max_length - max_question_length - tokenizer.num_special_tokens_to_add(pair=True)
+        self.doc_stride = min(doc_stride, self.window_length // 2)
+        # Passage encodings on a shared PassageIndex are only reused by runners that tokenize alike
+        self.encoding_key = (getattr(tokenizer, "name_or_path", None) or tokenizer, self.window_length, self.doc_stride)
+
+    @classmethod
+    def from_pipeline(cls, qa_pipeline, **kwargs):
+        return cls(qa_pipeline.model, qa_pipeline.tokenizer, **kwargs)
+
+    def encode(self, context, char_offset=0):
+        """Tokenize a context once, keeping offsets and the stride windows"""
+        encoding = self.tokenizer(context, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+        input_ids = encoding["input_ids"]
+
+        # Answers snap to whole words, like the pipeline's align_to_words
+        offsets = []
+        for token_index, word_index in enumerate(encoding.word_ids()):
+            if word_index is None:
+                offsets.append(tuple(encoding["offset_mapping"][token_index]))
+            else:
+                offsets.append(tuple(encoding.word_to_chars(word_index)))
+
+        windows = []
+        step = self.window_length - self.doc_stride
+        start = 0
+        while start < len(input_ids):
+            end = min(start + self.window_length, len(input_ids))
+            windows.append((start, end))
+            if end == len(input_ids):
+                break
+            start += step
+        return EncodedContext(context, input_ids, offsets, windows, char_offset)
+
+    def contexts_for(self, questions, index, top_k=3):
+        """
+        Encoded top-k passages for each question from a PassageIndex.
+        Every passage is tokenized at most once per tokenizer and window
+        settings and kept on the index, which other generators may share.
+        """
+        contexts = []
+        for question in questions:
+            parts = []
+            for passage_id in index.search(question, top_k):
+                key = (*self.encoding_key, passage_id)
+                if key not in index.encodings:
+                    index.encodings[key] = self.encode(index.passages[passage_id], char_offset=index.starts[passage_id])
+                parts.append(index.encodings[key])
+            contexts.append(parts)
+        return contexts
+
+    def answer(self, questions, contexts, batch_size=8):
+        """
+        Answer each question against its encoded context(s).
+        contexts is one EncodedContext shared by all questions, or one entry per
+        question holding an EncodedContext or a list of them.
+        Returns pipeline-style dicts (answer, score, start, end), or None when
+        a question has no context to read.
+        """
+        if isinstance(contexts, EncodedContext):
+            contexts = [contexts] * len(questions)
+
+        # Memoized answers are reused; repeated questions in this call run once
+        best = [None] * len(questions)
+        pending = {}    # memo key -> indices of the questions sharing it
+        for index, (question, encoded) in enumerate(zip(questions, contexts)):
+            key = self._memo_key(question, encoded)
+            cached = self.memo.get(key) if self.memo is not None else None
+            if cached is not None:
+                best[index] = cached
+            else:
+                pending.setdefault(key, []).append(index)
+        if not pending:
+            return best
+
+        unique = [indices[0] for indices in pending.values()]
+        answers = self._answer_uncached([questions[i] for i in unique], [contexts[i] for i in unique], batch_size)
+        for (key, indices), answer in zip(pending.items(), answers):
+            if answer is None:
+                continue
+            if self.memo is not None:
+                self.memo.put(key, answer)
+            for index in indices:
+                best[index] = dict(answer)
+        return best
+
+    def _memo_key(self, question, encoded):
+        parts = encoded if isinstance(encoded, (list, tuple)) else [encoded]
+        digest = "|".join(f"{part.digest}@{part.char_offset}" for part in parts)
+        return QAMemo.key((getattr(self.model, "name_or_path", type(self.model).__name__), self.window_length, self.doc_stride), question, digest, self.uncased)
+
+    def _answer_uncached(self, questions, contexts, batch_size):
+        question_ids = self.tokenizer(list(questions), add_special_tokens=False)["input_ids"]
+
+        # One feature per (question, window) pair
+        features = []
+        for q_index, (q_ids, encoded) in enumerate(zip(question_ids, contexts)):
+            q_ids = q_ids[:self.max_question_length]
+            context_start = len(self.tokenizer.build_inputs_with_special_tokens(q_ids, [])) - 1
+            for part in (encoded if isinstance(encoded, (list, tuple)) else [encoded]):
+                for window in part.windows:
+                    features.append((q_index, q_ids, part, window, context_start))
+
+        best = [None] * len(questions)
+        # Length-sorted batches keep padding to a minimum
+        features.sort(key=lambda f: len(f[1]) + f[3][1] - f[3][0])
+        for i in range(0, len(features), batch_size):
+            batch = features[i:i + batch_size]
+            start_logits, end_logits = self._forward(batch)
+            for feature, starts, ends in zip(batch, start_logits, end_logits):
+                candidate = self._best_span(feature, starts, ends)
+                q_index = feature[0]
+                if best[q_index] is None or candidate["score"] > best[q_index]["score"]:
+                    best[q_index] = candidate
+        return best
+
+    def _forward(self, batch):
+        sequences, token_types = [], []
+        for _, q_ids, encoded, (start, end), _ in batch:
+            w_ids = encoded.input_ids[start:end]
+            sequences.append(self.tokenizer.build_inputs_with_special_tokens(q_ids, w_ids))
+            if self.use_token_types:
+                token_types.append(self.tokenizer.create_token_type_ids_from_sequences(q_ids, w_ids))
+
+        width = max(len(seq) for seq in sequences)
+        pad_id = self.tokenizer.pad_token_id or 0
+        input_ids = torch.full((len(sequences), width), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(sequences), width), dtype=torch.long)
+        for row, seq in enumerate(sequences):
+            input_ids[row, :len(seq)] = torch.tensor(seq, dtype=torch.long)
+            attention_mask[row, :len(seq)] = 1
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if self.use_token_types:
+            token_type_ids = torch.zeros((len(sequences), width), dtype=torch.long)
+            for row, types in enumerate(token_types):
+                token_type_ids[row, :len(types)] = torch.tensor(types, dtype=torch.long)
+            inputs["token_type_ids"] = token_type_ids
+
+        device = getattr(self.model, "device", None)
+        if device is not None:
+            inputs = {name: tensor.to(device) for name, tensor in inputs.items()}
+        with torch.no_grad():
+            output = self.model(**inputs)
+        return output.start_logits.float().cpu().numpy(), output.end_logits.float().cpu().numpy()
+
+    def _best_span(self, feature, start_logits, end_logits):
+        """Highest scoring answer span inside the feature's context tokens"""
+        _, _, encoded, (start, end), context_start = feature
+        length = end - start
+
+        # Softmax over the context tokens plus the leading CLS token, as the pipeline does
+        # once it masks question and special tokens; CLS is then left out of the spans
+        starts = _softmax_with_cls(start_logits, context_start, length)
+        ends = _softmax_with_cls(end_logits, context_start, length)
+
+        scores = np.triu(np.outer(starts, ends))
+        scores = np.tril(scores, self.max_answer_length - 1)
+        span_start, span_end = np.unravel_index(np.argmax(scores), scores.shape)
+        char_start = encoded.offsets[start + span_start][0]
+        char_end = encoded.offsets[start + span_end][1]
+        return {
+            "score": float(scores[span_start, span_end]),
+            "start": encoded.char_offset + char_start,
+            "end": encoded.char_offset + char_end,
+            "answer": encoded.text[char_start:char_end]
+        }
+
+
+def _softmax_with_cls(logits, context_start, length):
+    kept = np.concatenate(([logits[0]], logits[context_start:context_start + length]))
+    probs = np.exp(kept - kept.max())
+    return probs[1:] / probs.sum()
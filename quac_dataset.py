@@ -0,0 +1,130 @@
+# quac_dataset.py
+"""
+Streaming QuAC loading for fine-tuning.
+
+The SQuAD-style JSON is parsed one article at a time instead of with a single
+json.load, a fixed-size sample is drawn with reservoir sampling in one pass,
+and the tokenized train/eval splits are saved as Arrow shards keyed by the
+source file, tokenizer and preprocessing settings. Later runs with the same
+settings memory-map those shards instead of tokenizing again.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+
+TOKENIZED_DIR = os.path.join("outputs", "tokenized")
+READ_SIZE = 1 << 20
+
+_DATA_ARRAY = re.compile(r'"data"\s*:\s*\[')
+_SEPARATORS = " \t\r\n,"
+
+
+# ---------------- STREAMING ---------------- #
+def iter_articles(path, read_size=READ_SIZE):
+    """Yield the entries of the top-level "data" array one at a time, reading the file in blocks"""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer, eof = "", False
+
+        # Skip ahead to the opening bracket of "data"
+        while True:
+            match = _DATA_ARRAY.search(buffer)
+            if match:
+                buffer = buffer[match.end():]
+                break
+            if eof:
+                return
+            block = f.read(read_size)
+            eof = not block
+            buffer = buffer[-64:] + block   # Keep a tail in case the key straddles two blocks
+
+        while True:
+            buffer = buffer.lstrip(_SEPARATORS)
+            if buffer.startswith("]"):
+                return
+            try:
+                article, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                block = f.read(read_size)   # Article not complete yet: read on and retry
+                eof = not block
+                buffer += block
+                continue
+            yield article
+            buffer = buffer[end:]
+
+
+def iter_qa_pairs(path):
+    """{"context", "question", "answer"} for every answered question, streamed from the file"""
+    for item in iter_articles(path):
+        for paragraph in item.get("paragraphs", []):
+            context = paragraph.get("context", "")
+            for qa in paragraph.get("qas", []):
+                question = qa.get("question", "")
+                answer = qa.get("answers", [{}])[0].get("text", "") if qa.get("answers") else ""
+                if context and question and answer:
+                    yield {"context": context, "question": question, "answer": answer}
+
+
+def reservoir_sample(items, size, seed=42):
+    """Uniform sample of size items from an iterable of unknown length, in one pass (Algorithm R)"""
+    rng = random.Random(seed)
+    sample = []
+    for seen, item in enumerate(items):
+        if seen < size:
+            sample.append(item)
+        else:
+            slot = rng.randint(0, seen)
+            if slot < size:
+                sample[slot] = item
+    rng.shuffle(sample)   # Reservoir order is biased towards early items; training wants it mixed
+    return sample
+
+
+# ---------------- TOKENIZED CACHE ---------------- #
+def cache_key(path, tokenizer, **settings):
+    """Hash of the source file's identity, the tokenizer and the preprocessing settings"""
+    stat = os.stat(path)
+    parts = [os.path.abspath(path), stat.st_size, stat.st_mtime_ns,
+             getattr(tokenizer, "name_or_path", ""), type(tokenizer).__name__, len(tokenizer), sorted(settings.items())]
+    return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def tokenized_splits(path, tokenizer, sample_size=500, test_size=0.2, seed=42, max_input_length=512,
+                     max_target_length=64, padding="max_length", cache_dir=TOKENIZED_DIR):
+    """
+    Tokenized (train, eval) datasets of context -> question pairs.
+    sample_size=None streams every pair into Arrow without holding the corpus in memory.
+    Results are stored under cache_dir/<key>/ and memory-mapped on later calls.
+    """
+    from datasets import Dataset, Features, Value, load_from_disk
+
+    key = cache_key(path, tokenizer, sample_size=sample_size, test_size=test_size, seed=seed, max_input_length=max_input_length,
+                    max_target_length=max_target_length, padding=padding)
+    target = os.path.join(cache_dir, key)
+    if os.path.isdir(target):
+        return load_from_disk(os.path.join(target, "train")), load_from_disk(os.path.join(target, "eval"))
+
+    features = Features({"context": Value("string"), "question": Value("string"), "answer": Value("string")})
+    if sample_size is None:
+        dataset = Dataset.from_generator(iter_qa_pairs, features=features, gen_kwargs={"path": path})
+    else:
+        dataset = Dataset.from_list(reservoir_sample(iter_qa_pairs(path), sample_size, seed), features=features)
+    splits = dataset.train_test_split(test_size=test_size, seed=seed)
+
+    def preprocess(batch):
+        model_inputs = tokenizer(batch["context"], max_length=max_input_length, truncation=True, padding=padding)
+        model_inputs["labels"] = tokenizer(batch["question"], max_length=max_target_length, truncation=True, padding=padding)["input_ids"]
+        return model_inputs
+
+    # Written to a scratch directory first so an interrupted run never leaves a half-built cache behind
+    scratch = target + ".tmp"
+    shutil.rmtree(scratch, ignore_errors=True)
+    for name, split in (("train", splits["train"]), ("eval", splits["test"])):
+        split.map(preprocess, batched=True, remove_columns=split.column_names).save_to_disk(os.path.join(scratch, name))
+    os.replace(scratch, target)
+    return load_from_disk(os.path.join(target, "train")), load_from_disk(os.path.join(target, "eval"))
@@ -0,0 +1,246 @@
+# question_bank.py
+"""
+Pre-generated question bank in SQLite.
+
+Ingestion runs the three generators once per document at every difficulty
+and stores the whole pool, indexed by (document, type, difficulty,
+confidence). Quizzes are then sampled from the pool with one indexed query
+and no model calls; swapping a single question is the same query with the
+quiz's current questions excluded.
+
+    python question_bank.py ingest --input docs/ --pool-size 20
+    python question_bank.py sample --document lecture.pdf --type mcq --difficulty hard --count 5
+    python question_bank.py stats
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+BANK_PATH = os.path.join("outputs", "question_bank.sqlite3")
+QUESTION_TYPES = ["mcq", "short_answer", "true_false"]
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    digest      TEXT PRIMARY KEY,
+    name        TEXT,
+    words       INTEGER,
+    ingested_at REAL
+);
+CREATE TABLE IF NOT EXISTS questions (
+    id            INTEGER PRIMARY KEY,
+    document      TEXT NOT NULL REFERENCES documents (digest),
+    question_type TEXT NOT NULL,
+    difficulty    TEXT NOT NULL,
+    confidence    REAL,
+    question      TEXT NOT NULL,
+    payload       TEXT NOT NULL,
+    UNIQUE (document, question_type, difficulty, question)
+);
+CREATE INDEX IF NOT EXISTS questions_by_confidence ON questions (document, question_type, difficulty, confidence);
+"""
+
+
+def _question_text(question_type, question):
+    return question[0] if question_type == "true_false" else question["question"]
+
+
+def _decode(question_type, payload):
+    """Stored JSON back into the shape the generator returned (true/false items are tuples)"""
+    question = json.loads(payload)
+    return tuple(question) if question_type == "true_false" else question
+
+
+class QuestionBank:
+    """
+    Question pools per (document digest, question type, difficulty). Questions
+    are stored exactly as the generators return them, so they can be shown and
+    exported like freshly generated ones. Safe to share between threads.
+    """
+    def __init__(self, path=BANK_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")   # Readers are not blocked while a document is ingested
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._db.close()
+
+    # ---------------- WRITES ---------------- #
+    def add_document(self, digest, name=None, words=None):
+        with self._lock, self._db:
+            self._db.execute("INSERT INTO documents (digest, name, words, ingested_at) VALUES (?, ?, ?, ?) "
+                             "ON CONFLICT (digest) DO UPDATE SET name = excluded.name, words = excluded.words, "
+                             "ingested_at = excluded.ingested_at", (digest, name, words, time.time()))
+
+    def add(self, digest, question_type, difficulty, questions, confidences=None):
+        """Store questions (confidences: one float or None each); returns how many were new"""
+        confidences = confidences or [None] * len(questions)
+        rows = [(digest, question_type, difficulty, confidence, _question_text(question_type, question), json.dumps(question))
+                for question, confidence in zip(questions, confidences)]
+        with self._lock, self._db:
+            before = self._db.total_changes
+            self._db.executemany("INSERT OR IGNORE INTO questions (document, question_type, difficulty, confidence, question, payload) "
+                                 "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            return self._db.total_changes - before
+
+    def ingest(self, context, name=None, pool_size=20, question_types=QUESTION_TYPES, difficulties=DIFFICULTIES, mixed=None):
+        """
+        Generate a pool of pool_size questions per type at every difficulty
+        (sections run concurrently) and store them. The quiz cache is bypassed,
+        so re-ingesting a document adds fresh questions, and MCQs are drawn
+        from every key concept rather than the first five; an MCQ pool is
+        still capped by the document's key-concept sentences. True/false
+        statements are graded with the NLI model once here: their confidence
+        is the model's score when it agrees with the statement's label, else 0.
+        Returns ({(type, difficulty): new questions}, {(type, difficulty): error}).
+        """
+        from document import as_document
+        from nli_scorer import classify_statements
+
+        document = as_document(context)
+        mixed = mixed or ingestion_generator()
+        self.add_document(document.digest, name, len(document))
+        added, errors = {}, {}
+        for difficulty in difficulties:
+            sections, failed = mixed.generate(document, {question_type: pool_size for question_type in question_types}, difficulty)
+            for question_type, questions in sections.items():
+                if question_type == "short_answer":
+                    confidences = [q.get("confidence") for q in questions]
+                elif question_type == "true_false":
+                    grades = classify_statements(document, [statement for statement, _ in questions], trim_premise=True)
+                    confidences = [grade["score"] if grade["label"] == label.lower() else 0.0
+                                   for (_, label), grade in zip(questions, grades)]
+                else:
+                    confidences = None   # MCQs carry no score
+                added[question_type, difficulty] = self.add(document.digest, question_type, difficulty, questions, confidences)
+            for question_type, message in failed.items():
+                errors[question_type, difficulty] = message
+        return added, errors
+
+    # ---------------- READS ---------------- #
+    @staticmethod
+    def _pool_filter(min_confidence, exclude):
+        sql, params = "document = ? AND question_type = ? AND difficulty = ?", []
+        if min_confidence is not None:
+            sql += " AND confidence >= ?"   # Questions without a score never pass a threshold
+            params.append(min_confidence)
+        if exclude:
+            sql += f" AND id NOT IN ({', '.join('?' * len(exclude))})"
+            params.extend(exclude)
+        return sql, params
+
+    def count(self, digest, question_type, difficulty, min_confidence=None):
+        sql, params = self._pool_filter(min_confidence, ())
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM questions WHERE {sql}", [digest, question_type, difficulty, *params]).fetchone()[0]
+
+    def sample(self, digest, question_type, difficulty, count, min_confidence=None, exclude=()):
+        """Up to count random (id, question) pairs from the pool, skipping the ids in exclude"""
+        sql, params = self._pool_filter(min_confidence, list(exclude))
+        with self._lock:
+            rows = self._db.execute(f"SELECT id, payload FROM questions WHERE {sql} ORDER BY RANDOM() LIMIT ?",
+                                    [digest, question_type, difficulty, *params, count]).fetchall()
+        return [(question_id, _decode(question_type, payload)) for question_id, payload in rows]
+
+    def replace(self, digest, question_type, difficulty, current_ids, min_confidence=None):
+        """A different (id, question) for a quiz holding current_ids, or None when the pool is used up"""
+        drawn = self.sample(digest, question_type, difficulty, 1, min_confidence, exclude=current_ids)
+        return drawn[0] if drawn else None
+
+    def find_document(self, name_or_digest):
+        """Digest of a stored document given its name or digest, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT digest FROM documents WHERE digest = ? OR name = ? ORDER BY ingested_at DESC LIMIT 1",
+                                   (name_or_digest, name_or_digest)).fetchone()
+        return row[0] if row else None
+
+    def stats(self):
+        """(document name, type, difficulty, questions, mean confidence) per pool"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COALESCE(d.name, q.document), q.question_type, q.difficulty, COUNT(*), AVG(q.confidence) "
+                "FROM questions q LEFT JOIN documents d ON d.digest = q.document "
+                "GROUP BY q.document, q.question_type, q.difficulty ORDER BY 1, 2, 3").fetchall()
+
+
+def ingestion_generator():
+    """Mixed-quiz generator for pools: no quiz cache and no cap on MCQ concepts"""
+    from mixed_quiz import MixedQuizGenerator
+    return MixedQuizGenerator(cache=None, max_concepts=None)
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_bank(path=BANK_PATH):
+    """Process-wide bank at path, or None while nothing has been ingested there"""
+    with _shared_lock:
+        if path not in _shared and os.path.exists(path):
+            _shared[path] = QuestionBank(path)
+        return _shared.get(path)
+
+
+def draw_quiz(document, question_type, difficulty, count, bank=None):
+    """count stored questions for a Document (no model calls), or None when its pool holds fewer"""
+    bank = bank or shared_bank()
+    if bank is None:
+        return None
+    drawn = bank.sample(document.digest, question_type, difficulty, count)
+    return [question for _, question in drawn] if len(drawn) == count else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the pre-generated question bank")
+    parser.add_argument("--bank", default=BANK_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Generate and store question pools for documents")
+    ingest.add_argument("--input", required=True, help="Directory of .pdf/.txt files, or one file")
+    ingest.add_argument("--pool-size", type=int, default=20, help="Questions requested per type and difficulty")
+    ingest.add_argument("--question-types", nargs="+", choices=QUESTION_TYPES, default=QUESTION_TYPES)
+
+    sample = commands.add_parser("sample", help="Draw a quiz from the bank")
+    sample.add_argument("--document", required=True, help="Document name or digest")
+    sample.add_argument("--type", choices=QUESTION_TYPES, default="mcq")
+    sample.add_argument("--difficulty", choices=DIFFICULTIES, default="medium")
+    sample.add_argument("--count", type=int, default=5)
+    sample.add_argument("--min-confidence", type=float)
+
+    commands.add_parser("stats", help="Pool sizes per document, type and difficulty")
+    args = parser.parse_args()
+
+    bank = QuestionBank(args.bank)
+    if args.command == "ingest":
+        from batch_generate import read_text
+        mixed = ingestion_generator()   # Generators (and their models) are shared by every document
+        paths = [args.input] if os.path.isfile(args.input) else [
+            os.path.join(args.input, name) for name in sorted(os.listdir(args.input)) if name.lower().endswith((".pdf", ".txt"))]
+        for path in paths:
+            start = time.perf_counter()
+            added, errors = bank.ingest(read_text(path), name=os.path.basename(path), pool_size=args.pool_size,
+                                        question_types=args.question_types, mixed=mixed)
+            print(f"{os.path.basename(path)}: {sum(added.values())} new questions in {time.perf_counter() - start:.1f}s")
+            for (question_type, difficulty), message in errors.items():
+                print(f"  {question_type}/{difficulty} failed: {message}")
+    elif args.command == "sample":
+        digest = bank.find_document(args.document)
+        if digest is None:
+            parser.error(f"No document named {args.document} in {args.bank}")
+        for number, (question_id, question) in enumerate(bank.sample(digest, args.type, args.difficulty, args.count, args.min_confidence), 1):
+            print(f"Q{number} [#{question_id}]: {json.dumps(question, ensure_ascii=False)}")
+    else:
+        for name, question_type, difficulty, total, confidence in bank.stats():
+            mean = f"{confidence:.2f}" if confidence is not None else "-"
+            print(f"{name[:40]:<40} {question_type:<13} {difficulty:<7} {total:>6} questions  mean confidence {mean}")
+    bank.close()
+
+
+if __name__ == "__main__":
+    main()
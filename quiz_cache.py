@@ -0,0 +1,117 @@
+# quiz_cache.py
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+QUIZ_CACHE_DIR = os.path.join("outputs", "quiz_cache")
+
+
+class LRUCache:
+    """Thread-safe in-memory mapping that evicts the least recently used entry once full"""
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def write_atomic(path, write, binary=False):
+    """
+    Create path atomically from write(file). Every writer gets its own temporary
+    file, so concurrent writers of one key never replace each other's file and
+    a killed writer never leaves a truncated one.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    handle, scratch = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with (os.fdopen(handle, "wb") if binary else os.fdopen(handle, "w", encoding="utf-8")) as f:
+            write(f)
+        os.replace(scratch, path)
+    except BaseException:
+        if os.path.exists(scratch):
+            os.remove(scratch)
+        raise
+
+
+def write_json(path, value):
+    """Write value as JSON to path atomically"""
+    write_atomic(path, lambda f: json.dump(value, f))
+
+
+class QuizCache:
+    """
+    Generated quizzes keyed by (document hash, question type, difficulty, count, model versions).
+    Recent quizzes are served from memory; every quiz is also written as JSON
+    under outputs/quiz_cache/ so repeat requests survive restarts.
+    """
+    def __init__(self, max_entries=128, directory=QUIZ_CACHE_DIR):
+        self.memory = LRUCache(max_entries)
+        self.directory = directory
+
+    @staticmethod
+    def make_key(document_digest, question_type, difficulty, count, *model_versions):
+        parts = [document_digest, question_type, difficulty, count, *model_versions]
+        return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Cached quiz for key, or None"""
+        quiz = self.memory.get(key)
+        if quiz is None and self.directory and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    quiz = json.load(f)
+                self.memory.put(key, quiz)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable quiz cache entry {key}: {e}")
+                return None
+        # Hand out a copy so callers can shuffle or edit the questions freely
+        return json.loads(json.dumps(quiz)) if quiz is not None else None
+
+    def put(self, key, quiz):
+        """Store a quiz; it must be JSON-serialisable"""
+        quiz = json.loads(json.dumps(quiz))
+        self.memory.put(key, quiz)
+        if self.directory:
+            try:
+                write_json(self._path(key), quiz)
+            except OSError as e:
+                # The quiz is still served from memory; only persistence is lost
+                print(f"Could not write quiz cache entry {key}: {e}")
+
+    def clear(self):
+        self.memory.clear()
+
+
+# ---------------- SHARED CACHE ---------------- #
+quiz_cache = QuizCache()
@@ -0,0 +1,191 @@
+# quiz_export.py
+"""
+Quiz export to PDF, CSV, JSON and GIFT (Moodle's import format).
+
+Generators' output is first turned into flat question items, which every
+writer consumes one at a time straight into a file object, so a 1000-question
+bank is never assembled into one string. The PDF font (a Unicode TTF when one
+is available, so non-latin text renders) is set up once per document, and its
+parsed metrics are cached on disk for later documents.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import fpdf
+from fpdf import FPDF
+
+EXPORT_FORMATS = {
+    "pdf": ("application/pdf", "pdf"),
+    "csv": ("text/csv", "csv"),
+    "json": ("application/json", "json"),
+    "gift": ("text/plain", "gift.txt"),
+}
+CSV_FIELDS = ["number", "type", "question", "options", "answer"]
+FONT_CACHE_DIR = os.path.join("outputs", "fonts")
+
+# Unicode fonts tried in order when QUIZ_PDF_FONT is not set
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+]
+
+_GIFT_SPECIAL = re.compile(r"([~=#{}:\\])")
+_WHITESPACE = re.compile(r"\s+")
+
+
+# ---------------- QUESTION ITEMS ---------------- #
+def question_items(question_type, questions, start=1):
+    """
+    Flat items from a generator's output: number, type, question, options,
+    answer (option letter, expected keyword or True/False) and, for MCQs,
+    the index of the correct option
+    """
+    for number, q in enumerate(questions, start):
+        if question_type == "mcq":
+            yield {"number": number, "type": "mcq", "question": q["question"], "options": list(q["options"]),
+                   "answer": chr(65 + q["correct_answer"]), "correct": q["correct_answer"]}
+        elif question_type == "short_answer":
+            yield {"number": number, "type": "short_answer", "question": q["question"], "options": [], "answer": q["answer"]}
+        else:
+            statement, label = q
+            yield {"number": number, "type": "true_false", "question": statement, "options": [],
+                   "answer": "True" if label == "ENTAILMENT" else "False"}
+
+
+def items_from_rows(rows):
+    """Question items from batch_generate.py rows (options joined with ' | ', MCQ answers as letters)"""
+    for number, row in enumerate(rows, 1):
+        options = [option for option in row.get("options", "").split(" | ") if option]
+        item = {"number": number, "type": row["question_type"], "question": row["question"], "options": options, "answer": row["answer"]}
+        if item["type"] == "mcq":
+            item["correct"] = ord(row["answer"]) - 65
+        yield item
+
+
+# ---------------- TEXT FORMATS ---------------- #
+def write_csv(items, f):
+    writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for item in items:
+        writer.writerow(dict(item, options=" | ".join(item["options"])))
+
+
+def write_json(items, f):
+    """A JSON array, written one item at a time"""
+    f.write("[")
+    for i, item in enumerate(items):
+        f.write(",\n" if i else "\n")
+        f.write(json.dumps(item, ensure_ascii=False))
+    f.write("\n]\n")
+
+
+def _gift(text):
+    """Text escaped for GIFT on one line; a blank line (common in PDF text) would end the question"""
+    return _GIFT_SPECIAL.sub(r"\\\1", _WHITESPACE.sub(" ", str(text)).strip())
+
+
+def write_gift(items, f):
+    for item in items:
+        title = f"::Q{item['number']}:: {_gift(item['question'])} "
+        if item["type"] == "mcq":
+            choices = "\n".join(("=" if i == item["correct"] else "~") + _gift(option) for i, option in enumerate(item["options"]))
+            f.write(f"{title}{{\n{choices}\n}}\n\n")
+        elif item["type"] == "true_false":
+            f.write(f"{title}{{{'TRUE' if item['answer'] == 'True' else 'FALSE'}}}\n\n")
+        else:
+            f.write(f"{title}{{={_gift(item['answer'])}}}\n\n")
+
+
+# ---------------- PDF ---------------- #
+_font_path = False   # Not looked up yet
+
+
+def unicode_font():
+    """Path of a Unicode TTF for PDF export (QUIZ_PDF_FONT or a common system font), or None"""
+    global _font_path
+    if _font_path is False:
+        candidates = [os.environ.get("QUIZ_PDF_FONT")] + FONT_CANDIDATES
+        _font_path = next((path for path in candidates if path and os.path.exists(path)), None)
+        if _font_path:
+            # Parsed font metrics are pickled here once and reused by every later document
+            os.makedirs(FONT_CACHE_DIR, exist_ok=True)
+            fpdf.set_global("FPDF_CACHE_MODE", 2)
+            fpdf.set_global("FPDF_CACHE_DIR", FONT_CACHE_DIR)
+    return _font_path
+
+
+def write_pdf(items, f):
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    font = unicode_font()
+    if font:
+        pdf.add_font("QuizSans", "", font, uni=True)
+        pdf.set_font("QuizSans", size=12)
+        clean = str
+    else:
+        # Core fonts only cover latin-1: unsupported characters become '?' instead of failing the export
+        pdf.set_font("Arial", size=12)
+        clean = lambda text: text.encode("latin-1", "replace").decode("latin-1")
+
+    for item in items:
+        pdf.multi_cell(0, 8, clean(f"Q{item['number']}: {item['question']}"))
+        for i, option in enumerate(item["options"]):
+            pdf.multi_cell(0, 8, clean(f"   {chr(65 + i)}. {option}"))
+        label = "Expected keyword" if item["type"] == "short_answer" else "Answer"
+        pdf.multi_cell(0, 8, clean(f"{label}: {item['answer']}"))
+        pdf.ln(4)
+    f.write(pdf.output(dest="S").encode("latin-1"))
+
+
+# ---------------- ENTRY POINTS ---------------- #
+_WRITERS = {"csv": write_csv, "json": write_json, "gift": write_gift}
+
+
+def export(items, fmt, f):
+    """Write items to the binary file object f in the given format"""
+    if fmt == "pdf":
+        write_pdf(items, f)
+        return
+    text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+    try:
+        _WRITERS[fmt](items, text)
+    finally:
+        text.flush()
+        text.detach()   # Leave f open for the caller
+
+
+def export_file(items, fmt, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        export(items, fmt, f)
+
+
+def export_bytes(items, fmt):
+    """Export into memory, e.g. for a download button"""
+    buffer = io.BytesIO()
+    export(items, fmt, buffer)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert batch_generate.py output into PDF, CSV, JSON or GIFT")
+    parser.add_argument("input", help=".csv or .jsonl written by batch_generate.py")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="gift")
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    with open(args.input, "r", encoding="utf-8", newline="") as f:
+        rows = csv.DictReader(f) if args.input.endswith(".csv") else (json.loads(line) for line in f if line.strip())
+        export_file(items_from_rows(rows), args.format, args.output)
+    print(f"Exported to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,14 @@
 # quiz_logic.py
-import random
-import nltk
-from transformers import pipeline
-from nltk.tokenize import sent_tokenize
-
-# Download required tokenizer
-nltk.download('punkt', quiet=True)
-
-# Load NLI model
-nli = pipeline("text-classification", model="facebook/bart-large-mnli")
+from document import as_document
+from nli_scorer import classify_statements
+from perturbation import default_engine
+from truefalse_quiz import generate_true_false
 
 def validate_inputs(context, num_questions, difficulty):
-    if not context.strip():
+    document = as_document(context)   # Accepts raw text or a shared Document
+    if not document.text.strip():
         return False, "Context cannot be empty."
-    sentences = sent_tokenize(context)
+    sentences = document.sentences
     if len(sentences) < num_questions:
         return False, f"Context has only {len(sentences)} sentences, but {num_questions} questions requested."
     if difficulty not in ["easy", "medium", "hard"]:
@@ -21,34 +16,18 @@ def validate_inputs(context, num_questions, difficulty):
     return True, sentences
 
 def apply_noise(sentence: str, level: str) -> str:
-    if level == "easy":
-        return sentence
-    elif level == "medium":
-        if "Sun" in sentence:
-            return sentence.replace("Sun", "Moon")
-        return sentence.replace("is", "is not") if "is" in sentence else sentence
-    elif level == "hard":
-        if "eight" in sentence:
-            return sentence.replace("eight", "ten")
-        return sentence.replace("planets", "stars") if "planets" in sentence else sentence
-    return sentence
+    return default_engine().perturb(sentence, level)
 
 def generate_statements(context, n, difficulty, sentences):
-    random.seed(42)
-    selected = random.sample(sentences, min(n * 2, len(sentences)))
-    final = []
-    for s in selected:
-        clean = s.strip()
-        modified = apply_noise(clean, difficulty)
-        label = "ENTAILMENT" if clean == modified else "CONTRADICTION"
-        final.append({"statement": modified, "actual_label": label})
-        if len(final) >= n:
-            break
-    return final
+    statements = generate_true_false(cache=None).generate_statements(context, n, difficulty, sentences)
+    return [{"statement": statement, "actual_label": label} for statement, label in statements]
 
-def score_answers(context, answers):
+def score_answers(context, answers, batch_size=8, trim_premise=False):
     score = 0
     results = []
+    # Classify every validly answered statement in one batched NLI pass
+    valid = [a.get('statement') for a in answers if a.get('user_answer', '').strip().lower() in ['true', 'false']]
+    predictions = iter(classify_statements(context, valid, batch_size=batch_size, trim_premise=trim_premise))
     for answer in answers:
         statement = answer.get('statement')
         user_answer = answer.get('user_answer', '').strip().lower()
@@ -58,8 +37,7 @@ def score_answers(context, answers):
                 "result": "Invalid answer. Please use 'true' or 'false'."
             })
             continue
-        input_text = f"{context} [SEP] {statement}"
-        result = nli(input_text)[0]
+        result = next(predictions)
         if result["label"] == "neutral":
             results.append({
                 "statement": statement,
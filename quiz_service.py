@@ -0,0 +1,339 @@
+# quiz_service.py
+"""
+Local quiz-generation service with dynamic micro-batching.
+
+QA and NLI requests coming from concurrent callers are gathered into one
+model batch per time window, so the CPU runs a few large batches instead of
+many batch-size-1 calls. The queues are bounded (503 when full), every request
+has a timeout (504) and GET /metrics reports queue depths and batch sizes.
+
+    python quiz_service.py --port 8765
+    QUIZ_SERVICE_URL=http://127.0.0.1:8765 streamlit run app.py
+
+Endpoints:
+    POST /quiz     {"text", "question_type": mcq|short_answer|true_false, "difficulty", "num_questions"}
+    POST /nli      {"context", "statements": [...], "trim_premise": false}
+    GET  /metrics
+    GET  /metrics/prometheus   stage timings and counters (with --trace or QUIZ_TRACING=1)
+    GET  /health
+"""
+import argparse
+import asyncio
+import json
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+QUESTION_TYPES = ["mcq", "short_answer", "true_false"]
+
+
+class ServiceBusy(Exception):
+    """Raised when a queue is full; surfaces as HTTP 503"""
+
+
+class MicroBatcher:
+    """
+    Collects items from concurrent callers for up to window_ms (or until
+    max_batch items arrive) and hands them to process(items) as one batch on a
+    dedicated model thread.
+    """
+    def __init__(self, name, process, max_batch=16, window_ms=10, max_queue=256):
+        self.name = name
+        self.process = process
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-model")
+        self.metrics = {"batches": 0, "items": 0, "rejected": 0, "timeouts": 0, "errors": 0}
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item, timeout):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((item, future))
+        except asyncio.QueueFull:
+            self.metrics["rejected"] += 1
+            raise ServiceBusy(f"{self.name} queue is full")
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.metrics["timeouts"] += 1
+            raise
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Callers that already timed out are dropped from the batch
+            live = [(item, future) for item, future in batch if not future.done()]
+            if not live:
+                continue
+            self.metrics["batches"] += 1
+            self.metrics["items"] += len(live)
+            try:
+                results = await loop.run_in_executor(self.executor, self.process, [item for item, _ in live])
+                for (_, future), result in zip(live, results):
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                self.metrics["errors"] += 1
+                for _, future in live:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def snapshot(self):
+        batches = self.metrics["batches"]
+        return dict(self.metrics, queue_depth=self.queue.qsize(), max_queue=self.queue.maxsize,
+                    avg_batch_size=round(self.metrics["items"] / batches, 2) if batches else 0.0)
+
+
+class BatchingQARunner:
+    """
+    Stands in for a generator's QARunner: encoding stays local, while answer()
+    sends each question to the shared QA micro-batcher and blocks the calling
+    generator thread until its batch has run.
+    """
+    # ServiceBusy and timeouts must reach the client as 503/504; the generators'
+    # one-question-at-a-time pipeline fallback would only add unbatched work under overload
+    local_fallback = False
+
+    def __init__(self, runner, name, batcher, loop, timeout):
+        self.runner = runner
+        self.name = name
+        self.batcher = batcher
+        self.loop = loop
+        self.timeout = timeout
+
+    def encode(self, context, char_offset=0):
+        return self.runner.encode(context, char_offset)
+
+    def contexts_for(self, questions, index, top_k=3):
+        return self.runner.contexts_for(questions, index, top_k)
+
+    def answer(self, questions, contexts, batch_size=8):
+        if not isinstance(contexts, (list, tuple)):
+            contexts = [contexts] * len(questions)
+
+        async def submit_all():
+            return await asyncio.gather(*(self.batcher.submit((self.name, question, context), self.timeout)
+                                           for question, context in zip(questions, contexts)))
+        return asyncio.run_coroutine_threadsafe(submit_all(), self.loop).result()
+
+
+class QuizService:
+    def __init__(self, window_ms=10, max_batch=16, max_queue=256, request_timeout=120, max_requests=32, generation_workers=8):
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.request_timeout = request_timeout
+        self.max_requests = max_requests
+        self.generation_pool = ThreadPoolExecutor(max_workers=generation_workers, thread_name_prefix="quiz-request")
+        self.generators = {}
+        # abandoned: generation jobs still running after their request timed out
+        self.requests = {"in_flight": 0, "abandoned": 0, "total": 0, "rejected": 0, "timeouts": 0, "errors": 0}
+
+    async def start(self, host="127.0.0.1", port=8765):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._load_generators, loop)
+        self.qa_batcher.start()
+        self.nli_batcher.start()
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Quiz service listening on http://{host}:{port}")
+        return server
+
+    def _load_generators(self, loop):
+        from mcq_generator import AdvancedMCQGenerator
+        from short_answer_generator import QuestionGenerator
+        from truefalse_quiz import generate_true_false
+        from nli_scorer import classify_pairs
+
+        mcq = AdvancedMCQGenerator()
+        short_answer = QuestionGenerator()
+        qa_runners = {"mcq": mcq.qa_runner, "short_answer": short_answer.qa_runner}
+
+        def run_qa(items):
+            # Items from both generators may share a batch; each goes to the runner that owns its model
+            results = [None] * len(items)
+            for name, runner in qa_runners.items():
+                picked = [i for i, (owner, _, _) in enumerate(items) if owner == name]
+                if picked:
+                    answers = runner.answer([items[i][1] for i in picked], [items[i][2] for i in picked], batch_size=self.max_batch)
+                    for i, answer in zip(picked, answers):
+                        results[i] = answer
+            return results
+
+        def run_nli(items):
+            return classify_pairs([premise for premise, _ in items], [statement for _, statement in items], batch_size=self.max_batch)
+
+        self.qa_batcher = MicroBatcher("qa", run_qa, self.max_batch, self.window_ms, self.max_queue)
+        self.nli_batcher = MicroBatcher("nli", run_nli, self.max_batch, self.window_ms, self.max_queue)
+        for name, generator in (("mcq", mcq), ("short_answer", short_answer)):
+            generator.qa_runner = BatchingQARunner(generator.qa_runner, name, self.qa_batcher, loop, self.request_timeout)
+        self.generators = {"mcq": mcq, "short_answer": short_answer, "true_false": generate_true_false()}
+
+    # ---------------- REQUESTS ---------------- #
+    def _generate(self, payload):
+        from document import Document
+
+        question_type = payload.get("question_type", "mcq")
+        difficulty = payload.get("difficulty", "medium")
+        num_questions = int(payload.get("num_questions", 3))
+        if question_type not in QUESTION_TYPES:
+            raise ValueError(f"question_type must be one of {QUESTION_TYPES}")
+        document = Document(payload.get("text", ""))
+        generator = self.generators[question_type]
+        if question_type == "mcq":
+            return generator.generate_mcq(document, num_questions=num_questions, difficulty=difficulty)
+        if question_type == "short_answer":
+            return generator.generate_questions(document, num_questions=num_questions, difficulty=difficulty)
+        return generator.generate_statements(document, num_questions, difficulty)
+
+    async def _pooled(self, function, *args):
+        """
+        Run function on the generation pool. A job cannot be stopped once it
+        runs, so when its request times out it is counted as abandoned, and
+        keeps its request slot, until it actually finishes.
+        """
+        loop = asyncio.get_running_loop()
+        job = self.generation_pool.submit(function, *args)
+        try:
+            return await asyncio.wrap_future(job)
+        except asyncio.CancelledError:
+            self.requests["abandoned"] += 1
+            job.add_done_callback(lambda _: loop.call_soon_threadsafe(self._job_finished))
+            raise
+
+    def _job_finished(self):
+        self.requests["abandoned"] -= 1
+
+    async def quiz(self, payload):
+        return {"questions": await self._pooled(self._generate, payload)}
+
+    async def nli(self, payload):
+        context, statements = payload.get("context", ""), list(payload.get("statements", []))
+        if payload.get("trim_premise"):
+            from nli_scorer import relevant_premises
+            premises = await self._pooled(relevant_premises, context, statements)
+        else:
+            premises = [context] * len(statements)
+        results = await asyncio.gather(*(self.nli_batcher.submit(pair, self.request_timeout) for pair in zip(premises, statements)))
+        return {"results": list(results)}
+
+    def metrics(self):
+        return {"requests": dict(self.requests), "qa": self.qa_batcher.snapshot(), "nli": self.nli_batcher.snapshot()}
+
+    async def dispatch(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+        if method == "GET" and path == "/metrics":
+            return 200, self.metrics()
+        if method == "GET" and path == "/metrics/prometheus":
+            return 200, tracing.prometheus_text()
+        routes = {"/quiz": self.quiz, "/nli": self.nli}
+        if method != "POST" or path not in routes:
+            return 404, {"error": f"No route for {method} {path}"}
+        if self.requests["in_flight"] + self.requests["abandoned"] >= self.max_requests:
+            self.requests["rejected"] += 1
+            return 503, {"error": "Too many requests in flight, retry shortly"}
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return 400, {"error": "Body must be JSON"}
+
+        self.requests["in_flight"] += 1
+        self.requests["total"] += 1
+        try:
+            return 200, await asyncio.wait_for(routes[path](payload), self.request_timeout)
+        except ServiceBusy as e:
+            self.requests["rejected"] += 1
+            return 503, {"error": str(e)}
+        except asyncio.TimeoutError:
+            self.requests["timeouts"] += 1
+            return 504, {"error": f"Request timed out after {self.request_timeout}s"}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            self.requests["errors"] += 1
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.requests["in_flight"] -= 1
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+            if len(request_line) < 2:
+                status, response = 400, {"error": "Malformed request"}
+            else:
+                status, response = await self.dispatch(request_line[0].upper(), request_line[1].split("?")[0], body)
+            if isinstance(response, str):
+                data, content_type = response.encode("utf-8"), "text/plain; version=0.0.4"
+            else:
+                data, content_type = json.dumps(response).encode("utf-8"), "application/json"
+            reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error", 503: "Service Unavailable", 504: "Gateway Timeout"}[status]
+            writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+# ---------------- CLIENT ---------------- #
+def request_quiz(url, text, question_type, difficulty, num_questions, timeout=180):
+    """Ask a running quiz service for a quiz; raises RuntimeError with the service's message on failure"""
+    payload = {"text": text, "question_type": question_type, "difficulty": difficulty, "num_questions": num_questions}
+    request = urllib.request.Request(url.rstrip("/") + "/quiz", data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())["questions"]
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(json.loads(e.read() or b"{}").get("error", str(e)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve quiz generation with micro-batched model inference")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--window-ms", type=float, default=10, help="How long a batch waits for more callers")
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-queue", type=int, default=256, help="Queued model calls before new ones get 503")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument("--trace", action="store_true", help="Collect stage timings for /metrics/prometheus")
+    args = parser.parse_args()
+    if args.trace:
+        tracing.enable()
+
+    async def serve():
+        service = QuizService(args.window_ms, args.max_batch, args.max_queue, args.timeout)
+        server = await service.start(args.host, args.port)
+        async with server:
+            await server.serve_forever()
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# semantic_distractors.py
+import os
+import random
+import threading
+from collections import OrderedDict
+import numpy as np
+from model_registry import get_sentence_encoder, SENTENCE_ENCODER_MODEL
+from distractor_engine import FALLBACK_DISTRACTORS
+from quiz_cache import write_atomic
+
+# Cosine similarity band each difficulty draws from: easy distractors are clearly
+# unrelated to the answer, hard ones sit close to it without paraphrasing it
+SIMILARITY_BANDS = {'easy': (0.0, 0.35), 'medium': (0.25, 0.6), 'hard': (0.45, 0.85)}
+
+EMBEDDING_DIR = os.path.join("outputs", "embeddings")
+
+
+class EmbeddingCache:
+    """
+    Candidate embedding matrices keyed by (model, document hash).
+    Recent matrices stay in memory; every matrix is also saved as .npy so a
+    repeated document skips encoding even after a restart.
+    """
+    def __init__(self, max_entries=32, directory=EMBEDDING_DIR):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, model_name, digest):
+        return os.path.join(self.directory, f"{model_name.replace('/', '--')}-{digest}.npy")
+
+    def get(self, model_name, digest):
+        key = (model_name, digest)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        path = self._path(model_name, digest)
+        if self.directory and os.path.exists(path):
+            try:
+                matrix = np.load(path)
+            except (OSError, ValueError, EOFError) as e:
+                # A truncated or foreign file is a miss; the next put() replaces it
+                print(f"Ignoring unreadable embedding cache entry {path}: {e}")
+                return None
+            self._remember(key, matrix)
+            return matrix
+        return None
+
+    def put(self, model_name, digest, matrix):
+        self._remember((model_name, digest), matrix)
+        if self.directory:
+            try:
+                write_atomic(self._path(model_name, digest), lambda f: np.save(f, matrix), binary=True)
+            except OSError as e:
+                print(f"Could not write embedding cache entry {digest}: {e}")
+
+    def _remember(self, key, matrix):
+        with self._lock:
+            self._entries[key] = matrix
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+embedding_cache = EmbeddingCache()
+
+
+class SemanticDistractorRanker:
+    """
+    Ranks a document's distractor candidates against the correct answer.
+    Candidate sentences are embedded once into a normalized matrix, so each
+    answer costs one encoder call and one matrix-vector product.
+    """
+    def __init__(self, document, model_name=SENTENCE_ENCODER_MODEL, cache=embedding_cache):
+        self.pool = document.distractor_pool()
+        self.model_name = model_name
+        self.encoder = get_sentence_encoder(model_name)
+        self.matrix = cache.get(model_name, document.digest)
+        if self.matrix is None or len(self.matrix) != len(self.pool.sentences):   # Missing, or not this pool's candidates
+            sentences = [document.sentences[i] for i in self.pool.sentences]
+            self.matrix = self._encode(sentences) if sentences else np.zeros((0, 1), dtype=np.float32)
+            cache.put(model_name, document.digest, self.matrix)
+
+    def _encode(self, texts):
+        vectors = self.encoder.encode(texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def draw(self, correct_answer, difficulty, count=3, rng=random):
+        """Pick distractors whose similarity to the answer falls in the difficulty's band"""
+        phrases = self.pool.phrases.get(difficulty, self.pool.phrases['medium'])
+        low, high = SIMILARITY_BANDS.get(difficulty, SIMILARITY_BANDS['medium'])
+        distractors = []
+        if len(self.matrix):
+            similarities = self.matrix @ self._encode([correct_answer])[0]
+            similarities[list(self.pool.containing(correct_answer))] = np.nan
+
+            # In-band candidates first (most similar first), then the ones nearest the band
+            distance = np.where(similarities < low, low - similarities, np.maximum(similarities - high, 0.0))
+            order = np.lexsort((-similarities, distance))
+            seen = {correct_answer.lower()}
+            for position in order:
+                if len(distractors) >= count or np.isnan(similarities[position]):
+                    break
+                phrase = phrases[position]
+                if phrase and phrase.lower() not in seen:
+                    seen.add(phrase.lower())
+                    distractors.append(phrase)
+        while len(distractors) < count:
+            distractors.append(rng.choice(FALLBACK_DISTRACTORS))
+        return distractors
@@ -1,46 +1,123 @@
 import torch
 import random
-from transformers import pipeline, AutoModelForQuestionAnswering, AutoTokenizer
+from model_registry import get_qa_model, get_qa_pipeline
+from qa_runner import QARunner
+from passage_index import PassageIndex, needs_retrieval
+from document import as_document, digest_of
+from quiz_cache import quiz_cache
+import tracing
 
 class QuestionGenerator:
-    def __init__(self, model_name='deepset/roberta-base-squad2'):
+    def __init__(self, model_name='deepset/roberta-base-squad2', cache=quiz_cache):
         """
         Initialize question generation system
         """
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu' # Detect and set device
-        self.model = AutoModelForQuestionAnswering.from_pretrained(model_name)        # Load model and tokenizer
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         
-        # Create QA pipeline
-        self.qa_pipeline = pipeline('question-answering', model=self.model, tokenizer=self.tokenizer,device=0 if self.device == 'cuda' else -1)
+        # Shared QA model, loaded once per process on the selected backend
+        self.model_name = model_name
+        self.model, self.tokenizer = get_qa_model(model_name)
+        self.qa_runner = QARunner(self.model, self.tokenizer)
         
         # Question templates
         self.question_templates = ["What is the main idea of","Who is responsible for","When did this occur","Where does this take place","Why is this important","How does this work","What are the key features of","Explain the significance of","What is the purpose of","Describe the process of"]
+        self.last_stats = {}   # Accepted/rejected counts from the latest generate_questions call
+        self.cache = cache     # Generated quizzes by document and settings; None disables
 
-    def generate_questions(self, context, num_questions=3, difficulty='medium'):
+    @property
+    def qa_pipeline(self):
         """
-        Generate multiple questions from context
+        PyTorch QA pipeline, only loaded when the single-question fallback needs it
         """
-        generated_questions = []
-        attempts = 0
-        max_attempts = num_questions * 10
+        return get_qa_pipeline(self.model_name)
+
+    def draft_question(self, words):
+        """
+        Build one candidate question from a random 5-word snippet
+        """
+        template = random.choice(self.question_templates)    # Select random template
+        start_index = random.randint(0, max(0, len(words) - 5))
+        return f"{template} {' '.join(words[start_index:start_index+5])}?"
 
-        while len(generated_questions) < num_questions and attempts < max_attempts:
+    def same_answer(self, answer, other):
+        """
+        Whether two accepted answers are duplicates
+        """
+        return answer == other
+
+    def score_wave(self, questions, source, batch_size=8, top_k=3):
+        """
+        Answer a wave of candidate questions in one batched forward pass, over the cached context
+        encoding or, for a PassageIndex, over each question's top-k passages
+        """
+        try:
+            contexts = self.qa_runner.contexts_for(questions, source, top_k=top_k) if isinstance(source, PassageIndex) else source
+            return self.qa_runner.answer(questions, contexts, batch_size=batch_size)
+        except Exception as e:
+            if not getattr(self.qa_runner, "local_fallback", True):   # e.g. the quiz service's batching runner
+                raise
+            print(f"Batched scoring failed, scoring one question at a time: {e}")
+        results = []
+        for question in questions:
             try:
-                template = random.choice(self.question_templates)    # Select random template
-                words = context.split()      # Create question
-                start_index = random.randint(0, max(0, len(words) - 5))
-                full_question = f"{template} {' '.join(words[start_index:start_index+5])}?"
-                result = self.qa_pipeline(question=full_question, context=context)   # Get answer
-                
-                # Validate result
-                if (result['answer'] and len(result['answer']) > 3 and result['score'] > 0.5 and not any(q['answer'] == result['answer'] for q in generated_questions)):
-                    generated_questions.append({'question': full_question,'answer': result['answer'],'confidence': result['score']})
-                attempts += 1
-            
+                results.append(self.qa_pipeline(question=question, context=source.text))
             except Exception as e:
                 print(f"Question generation error: {e}")
-                attempts += 1
+                results.append(None)
+        return results
+
+    def generate_questions(self, context, num_questions=3, difficulty='medium', wave_size=None, batch_size=8, top_k=3):
+        """
+        Generate multiple questions from context (raw text or a Document).
+        Candidates are drafted in waves, each wave is scored in one batched pass, and
+        generation stops as soon as enough answers pass. Counts end up in self.last_stats.
+        """
+        generated_questions = []
+        max_attempts = num_questions * 10
+        stats = self.last_stats = {'attempts': 0,'accepted': 0,'rejected_short': 0,'rejected_low_score': 0,'rejected_duplicate': 0,'errors': 0,'unused': 0,'waves': 0,'cached': False}
+
+        # Repeat requests for the same document and settings are served from the cache
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(digest_of(context), 'short_answer', difficulty, num_questions, self.model.name_or_path, top_k)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                stats.update(accepted=len(cached), cached=True)
+                tracing.count("quiz_cache_hits")
+                return cached
+
+        document = as_document(context)
+        words = document.words
+        # Tokenize the context once for every wave; long texts are split into indexed passages instead
+        with tracing.span("qa_encode"):
+            source = document.passage_index() if needs_retrieval(len(document)) else self.qa_runner.encode(document.text)
+
+        while len(generated_questions) < num_questions and stats['attempts'] < max_attempts:
+            # Oversample what is still missing so a single wave usually fills the quiz
+            size = min(wave_size or 2 * (num_questions - len(generated_questions)), max_attempts - stats['attempts'])
+            candidates = [self.draft_question(words) for _ in range(size)]
+            with tracing.span("qa_inference"):
+                results = self.score_wave(candidates, source, batch_size=batch_size, top_k=top_k)
+            stats['waves'] += 1
+            stats['attempts'] += len(candidates)
+
+            for full_question, result in zip(candidates, results):
+                if len(generated_questions) >= num_questions:
+                    stats['unused'] += 1
+                elif result is None:
+                    stats['errors'] += 1
+                elif not result['answer'] or len(result['answer']) <= 3:
+                    stats['rejected_short'] += 1
+                elif result['score'] <= 0.5:
+                    stats['rejected_low_score'] += 1
+                elif any(self.same_answer(q['answer'], result['answer']) for q in generated_questions):
+                    stats['rejected_duplicate'] += 1
+                else:
+                    generated_questions.append({'question': full_question,'answer': result['answer'],'confidence': result['score']})
+                    stats['accepted'] += 1
+        if cache_key is not None and generated_questions:
+            self.cache.put(cache_key, generated_questions)
+        tracing.count("questions_generated", len(generated_questions))
         return generated_questions
 
     def display_questions(self, questions):
@@ -95,84 +172,23 @@ def main():
 
 if __name__ == "__main__":
     main()
-import torch
-import random
-from transformers import pipeline, AutoModelForQuestionAnswering, AutoTokenizer
 
-class QuestionGenerator:
-    def __init__(self, model_name='distilbert-base-uncased-distilled-squad'):
+class QuestionGenerator(QuestionGenerator):
+    """
+    Variant on a stable distilled QA model; drafting, wave scoring and
+    generation are inherited from the class above
+    """
+    def __init__(self, model_name='distilbert-base-uncased-distilled-squad', cache=quiz_cache):
         """
         Initialize question generation system using a stable QA model
         """
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        self.model = AutoModelForQuestionAnswering.from_pretrained(model_name)
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-
-        # Create QA pipeline
-        self.qa_pipeline = pipeline(
-            'question-answering',
-            model=self.model,
-            tokenizer=self.tokenizer,
-            device=0 if self.device == 'cuda' else -1
-        )
-
-        # Sample templates to simulate natural QA generation
-        self.question_templates = [
-            "What is the main idea of",
-            "Who is responsible for",
-            "When did this occur",
-            "Where does this take place",
-            "Why is this important",
-            "How does this work",
-            "What are the key features of",
-            "Explain the significance of",
-            "What is the purpose of",
-            "Describe the process of"
-        ]
-
-    def generate_questions(self, context, num_questions=3, difficulty='medium'):
-        """
-        Generate short answer questions based on provided context
-        """
-        generated_questions = []
-        attempts = 0
-        max_attempts = num_questions * 10
-
-        while len(generated_questions) < num_questions and attempts < max_attempts:
-            try:
-                template = random.choice(self.question_templates)
-                words = context.split()
-                start_index = random.randint(0, max(0, len(words) - 5))
-                snippet = ' '.join(words[start_index:start_index + 5])
-                full_question = f"{template} {snippet}?"
-
-                result = self.qa_pipeline(question=full_question, context=context)
-
-                # Validate and deduplicate
-                if (
-                    result['answer']
-                    and len(result['answer']) > 3
-                    and result['score'] > 0.5
-                    and not any(q['answer'].lower() == result['answer'].lower() for q in generated_questions)
-                ):
-                    generated_questions.append({
-                        'question': full_question,
-                        'answer': result['answer'],
-                        'confidence': result['score']
-                    })
-                attempts += 1
+        super().__init__(model_name, cache)
 
-            except Exception as e:
-                print(f"Question generation error: {e}")
-                attempts += 1
-
-        return generated_questions
-
-    def display_questions(self, questions):
-        print("\n--- Generated Questions ---")
-        for idx, q in enumerate(questions, 1):
-            print(f"Q{idx}: {q['question']}")
-            print(f"Expected keyword: {q['answer']} \n")
+    def same_answer(self, answer, other):
+        """
+        Answers differing only in case count as duplicates
+        """
+        return answer.lower() == other.lower()
 
 # Run this if testing standalone
 if __name__ == "__main__":
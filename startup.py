@@ -0,0 +1,87 @@
+# startup.py
+"""
+Import-time report for the Streamlit app.
+
+app.py's top-level imports are what a worker pays before it can draw the UI;
+everything it imports inside functions or branches is deferred to the first
+request that needs it. Both sets are read from app.py itself and each module
+is timed in a fresh interpreter, so the numbers are cold-start costs.
+
+    python startup.py                 # table of eager and deferred imports
+    python startup.py --budget 1.5    # exit 1 when the eager imports take longer (seconds)
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+_TIMER = "import time; start = time.perf_counter(); {imports}; print(time.perf_counter() - start)"
+
+
+def _module_names(node):
+    if isinstance(node, ast.Import):
+        return [alias.name for alias in node.names]
+    if isinstance(node, ast.ImportFrom) and node.level == 0:
+        return [node.module]
+    return []
+
+
+def app_imports(path=APP):
+    """(eager, deferred) module names imported by the app at top level and on first use"""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    eager = [name for node in tree.body for name in _module_names(node)]
+    deferred = []
+    for node in ast.walk(tree):
+        for name in _module_names(node):
+            if name not in eager and name not in deferred:
+                deferred.append(name)
+    return eager, deferred
+
+
+def import_seconds(modules, cwd=None):
+    """Wall time to import modules together in a fresh interpreter; None when the import fails"""
+    code = _TIMER.format(imports="; ".join(f"import {name}" for name in modules))
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd or os.path.dirname(APP), capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def report(path=APP):
+    """{"eager": {module: s}, "deferred": {module: s}, "eager_total": s}"""
+    eager, deferred = app_imports(path)
+    return {
+        "eager": {name: import_seconds([name]) for name in eager},
+        "deferred": {name: import_seconds([name]) for name in deferred},
+        "eager_total": import_seconds(eager),   # Shared dependencies counted once
+    }
+
+
+def _seconds(value):
+    return "  failed" if value is None else f"{value:7.2f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import times of app.py's eager and deferred imports")
+    parser.add_argument("--budget", type=float, help="Maximum seconds for the eager imports")
+    args = parser.parse_args()
+
+    timings = report()
+    for group in ("eager", "deferred"):
+        print(f"{group.capitalize()} imports:")
+        for name, seconds in sorted(timings[group].items(), key=lambda item: -(item[1] or 0)):
+            print(f"  {name:<28}{_seconds(seconds)}")
+    total = timings["eager_total"]
+    print(f"Startup imports total: {_seconds(total).strip()}")
+
+    if args.budget is not None and (total is None or total > args.budget):
+        print(f"Over the startup budget of {args.budget:.2f}s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
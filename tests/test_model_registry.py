@@ -0,0 +1,22 @@
+import time
+
+from model_registry import ModelRegistry
+
+IDLE = ("question-answering", "idle", ())
+BUSY = ("text-classification", "busy", ())
+
+
+def test_idle_model_is_released_while_others_are_hit():
+    registry = ModelRegistry(max_idle_seconds=0.05)
+    registry.get(IDLE, lambda: "idle model")
+    for _ in range(10):
+        time.sleep(0.02)
+        registry.get(BUSY, lambda: "busy model")
+    assert registry.loaded() == [("text-classification", "busy")]
+
+
+def test_idle_model_is_released_without_requests():
+    registry = ModelRegistry(max_idle_seconds=0.05)
+    registry.get(IDLE, lambda: "idle model")
+    time.sleep(0.3)
+    assert registry.loaded() == []
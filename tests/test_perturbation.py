@@ -0,0 +1,8 @@
+from perturbation import PerturbationEngine, default_engine
+
+
+def test_entity_is_not_swapped_for_a_name_written_with_it():
+    engine = PerturbationEngine(default_engine().rules)
+    sentences = ["Paris is in France.", "It was raining in Paris yesterday.", "We drove in France today."]
+    swapped = engine.perturb_sentences(sentences, "hard")[1]
+    assert swapped is None or swapped.replacement != "France"
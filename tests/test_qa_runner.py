@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+
+from transformers import BertTokenizerFast
+
+from passage_index import PassageIndex
+from qa_runner import QARunner
+
+WORDS = ["paris", "is", "the", "capital", "of", "france", "berlin", "germany", "."]
+
+
+def tokenizer(tmp_path, name, words):
+    vocab = tmp_path / f"{name}.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words), encoding="utf-8")
+    loaded = BertTokenizerFast(vocab_file=str(vocab))
+    loaded.name_or_path = name
+    return loaded
+
+
+def test_runners_with_different_vocabularies_get_their_own_passage_encodings(tmp_path):
+    sentences = ["Paris is the capital of France.", "Berlin is the capital of Germany."]
+    text = " ".join(sentences)
+    index = PassageIndex(text, max_words=6, sentences=sentences, sentence_offsets=[0, len(sentences[0]) + 1])
+    model = SimpleNamespace(name_or_path="stub")
+    first = QARunner(model, tokenizer(tmp_path, "first", WORDS))
+    second = QARunner(model, tokenizer(tmp_path, "second", list(reversed(WORDS))))
+
+    for runner in (first, second):
+        [parts] = runner.contexts_for(["What is the capital of France?"], index, top_k=1)
+        assert parts[0].input_ids == runner.encode(parts[0].text).input_ids
+    assert len(index.encodings) == 2
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+from mcq_generator import AdvancedMCQGenerator
+from quiz_service import BatchingQARunner, MicroBatcher, QuizService
+
+CONTEXT = "Paris is the capital of France. " * 10
+
+
+class StubRunner:
+    def encode(self, context, char_offset=0):
+        return context
+
+
+def test_full_qa_queue_returns_503_without_local_fallback(monkeypatch):
+    fallbacks = []
+
+    def pipeline(self):
+        fallbacks.append(True)
+        raise RuntimeError("the local pipeline must not be used")
+    monkeypatch.setattr(AdvancedMCQGenerator, "qa_pipeline", property(pipeline))
+
+    async def scenario():
+        release = threading.Event()
+
+        def process(items):
+            release.wait(5)
+            return [{"answer": "Paris", "score": 1.0}] * len(items)
+
+        service = QuizService(max_queue=1, request_timeout=5)
+        service.qa_batcher = MicroBatcher("qa", process, max_batch=1, window_ms=0, max_queue=1)
+        service.qa_batcher.start()
+        generator = AdvancedMCQGenerator.__new__(AdvancedMCQGenerator)   # No model weights needed
+        generator.qa_runner = BatchingQARunner(StubRunner(), "mcq", service.qa_batcher, asyncio.get_running_loop(), 5)
+        service._generate = lambda payload: generator.answer_questions(["What is the capital of France?"], CONTEXT)
+
+        # One item blocks the model thread, the next fills the queue
+        running = asyncio.ensure_future(service.qa_batcher.submit(("mcq", "q", CONTEXT), 5))
+        await asyncio.sleep(0.05)
+        queued = asyncio.ensure_future(service.qa_batcher.submit(("mcq", "q", CONTEXT), 5))
+        await asyncio.sleep(0)
+        assert service.qa_batcher.queue.full()
+
+        status, body = await service.dispatch("POST", "/quiz", b"{}")
+        release.set()
+        await asyncio.gather(running, queued)
+        return status, body
+
+    status, body = asyncio.run(scenario())
+    assert status == 503
+    assert "queue is full" in body["error"]
+    assert not fallbacks
+
+
+def test_timed_out_generation_holds_its_slot_until_it_finishes():
+    async def scenario():
+        release = threading.Event()
+        service = QuizService(request_timeout=0.05, max_requests=1)
+        service._generate = lambda payload: release.wait(5) and []
+
+        assert (await service.dispatch("POST", "/quiz", b"{}"))[0] == 504
+        assert service.requests["abandoned"] == 1
+        assert (await service.dispatch("POST", "/quiz", b"{}"))[0] == 503
+
+        release.set()
+        for _ in range(100):
+            if not service.requests["abandoned"]:
+                break
+            await asyncio.sleep(0.01)
+        assert service.requests["abandoned"] == 0
+        assert (await service.dispatch("POST", "/quiz", b"{}"))[0] == 200
+
+    asyncio.run(scenario())
@@ -0,0 +1,221 @@
+# tracing.py
+"""
+Opt-in stage timing for quiz generation.
+
+    with tracing.span("qa_inference"):
+        ...
+    tracing.count("questions_generated", len(questions))
+
+Spans and counters are recorded into the active trace() block (a per-request
+breakdown) and, when QUIZ_TRACING=1 or enable() was called, into process-wide
+totals exposed by prometheus_text(). With neither active, span() hands back a
+shared no-op context and count() returns immediately.
+"""
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_enabled = os.environ.get("QUIZ_TRACING", "").lower() in ("1", "true", "yes")
+_current = contextvars.ContextVar("quiz_trace", default=None)
+_lock = threading.Lock()
+_stage_seconds = {}     # stage -> [calls, total seconds]
+_counters = {}          # name -> total
+
+
+def enable():
+    """Record process-wide totals from now on"""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Forget the process-wide totals"""
+    with _lock:
+        _stage_seconds.clear()
+        _counters.clear()
+
+
+class Trace:
+    """Spans and counters of one request, in the order the spans started"""
+    def __init__(self, name):
+        self.name = name
+        self.spans = []         # (stage, depth, start offset, seconds)
+        self.counters = {}
+        self.depth = 0
+        self.started = time.perf_counter()
+        self.duration = None
+        self.token = None
+
+    def breakdown(self):
+        """Spans as rows for display, sorted by start time"""
+        total = self.duration or (time.perf_counter() - self.started)
+        return [
+            {"stage": "  " * depth + stage, "start_ms": round(offset * 1000, 1), "ms": round(seconds * 1000, 1),
+             "share": f"{seconds / total:.0%}" if total else ""}
+            for stage, depth, offset, seconds in sorted(self.spans, key=lambda s: (s[2], s[1]))
+        ]
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "trace", "start", "depth")
+
+    def __init__(self, name, trace):
+        self.name = name
+        self.trace = trace
+        self.depth = 0
+
+    def __enter__(self):
+        if self.trace is not None:
+            self.depth = self.trace.depth
+            self.trace.depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        if self.trace is not None:
+            self.trace.depth -= 1
+            self.trace.spans.append((self.name, self.depth, self.start - self.trace.started, elapsed))
+        if _enabled:
+            with _lock:
+                entry = _stage_seconds.setdefault(self.name, [0, 0.0])
+                entry[0] += 1
+                entry[1] += elapsed
+        return False
+
+
+def span(name):
+    """Context manager timing one stage"""
+    trace = _current.get()
+    if trace is None and not _enabled:
+        return _NOOP
+    return _Span(name, trace)
+
+
+def traced(name):
+    """Decorator form of span()"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    """Add to a counter"""
+    trace = _current.get()
+    if trace is None and not _enabled:
+        return
+    if trace is not None:
+        trace.counters[name] = trace.counters.get(name, 0) + value
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + value
+
+
+def begin(name="request"):
+    """Start collecting a trace in the current context; pair with end()"""
+    current = Trace(name)
+    current.token = _current.set(current)
+    return current
+
+
+def end(current):
+    """Stop collecting the trace started by begin()"""
+    current.duration = time.perf_counter() - current.started
+    _current.reset(current.token)
+    return current
+
+
+@contextmanager
+def trace(name="request"):
+    """Collect the spans and counters of everything run inside the block"""
+    current = begin(name)
+    try:
+        yield current
+    finally:
+        end(current)
+
+
+def current():
+    """The trace being collected in this context, or None"""
+    return _current.get()
+
+
+@contextmanager
+def branch(parent, name):
+    """
+    Time work running on another thread (a pool worker) as a span of parent,
+    the trace returned by current() in the submitting thread. The worker's
+    spans and counters are merged into parent when the block exits.
+    """
+    if parent is None:
+        with span(name):
+            yield
+        return
+    child = Trace(name)
+    child.started = parent.started   # Offsets line up with the parent's spans
+    child.depth = parent.depth
+    token = _current.set(child)
+    try:
+        with span(name):
+            yield
+    finally:
+        _current.reset(token)
+        with _lock:
+            parent.spans.extend(child.spans)
+            for counter, value in child.counters.items():
+                parent.counters[counter] = parent.counters.get(counter, 0) + value
+
+
+# ---------------- METRICS ---------------- #
+def snapshot():
+    """Process-wide totals: {"stages": {stage: {"calls", "seconds"}}, "counters": {...}}"""
+    with _lock:
+        return {
+            "stages": {stage: {"calls": calls, "seconds": seconds} for stage, (calls, seconds) in _stage_seconds.items()},
+            "counters": dict(_counters),
+        }
+
+
+def prometheus_text():
+    """Process-wide totals in the Prometheus text exposition format"""
+    totals = snapshot()
+    lines = [
+        "# HELP quiz_stage_seconds Time spent in each quiz generation stage.",
+        "# TYPE quiz_stage_seconds summary",
+    ]
+    for stage, entry in sorted(totals["stages"].items()):
+        lines.append(f'quiz_stage_seconds_sum{{stage="{stage}"}} {entry["seconds"]:.6f}')
+        lines.append(f'quiz_stage_seconds_count{{stage="{stage}"}} {entry["calls"]}')
+    for name, value in sorted(totals["counters"].items()):
+        lines.append(f"# TYPE quiz_{name}_total counter")
+        lines.append(f"quiz_{name}_total {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,72 @@
+# training_utils.py
+"""
+Throughput helpers for the seq2seq fine-tuning scripts: per-batch dynamic
+padding, length-grouped batches, gradient accumulation up to a target
+effective batch size, and a tokens/sec report.
+"""
+import math
+import time
+from transformers import DataCollatorForSeq2Seq, TrainerCallback
+
+
+def accumulation_steps(target_batch_size, per_device_batch_size, devices=1):
+    """Gradient accumulation steps needed to reach target_batch_size examples per optimizer step"""
+    return max(1, math.ceil(target_batch_size / (per_device_batch_size * devices)))
+
+
+def fast_training_kwargs(per_device_batch_size, target_batch_size):
+    """TrainingArguments options for length-grouped, accumulated training"""
+    return {
+        "per_device_train_batch_size": per_device_batch_size,
+        "gradient_accumulation_steps": accumulation_steps(target_batch_size, per_device_batch_size),
+        "group_by_length": True,   # Batches of similar length, so dynamic padding stays short
+    }
+
+
+class TokenCountingCollator:
+    """
+    Pads each batch only to its longest example (labels with -100, so padding
+    carries no loss) and counts real versus padded tokens of training batches.
+    """
+    def __init__(self, tokenizer, model=None, pad_to_multiple_of=None):
+        self.collator = DataCollatorForSeq2Seq(tokenizer, model=model, padding="longest", label_pad_token_id=-100,
+                                               pad_to_multiple_of=pad_to_multiple_of)
+        self.model = model
+        self.reset()
+
+    def reset(self):
+        self.real_tokens = 0
+        self.padded_tokens = 0
+
+    def __call__(self, features):
+        batch = self.collator(features)
+        if self.model is None or self.model.training:   # Evaluation batches stay out of the training throughput
+            self.real_tokens += int(batch["attention_mask"].sum()) + int((batch["labels"] != -100).sum())
+            self.padded_tokens += batch["attention_mask"].numel() + batch["labels"].numel()
+        return batch
+
+
+class TokenThroughputCallback(TrainerCallback):
+    """Prints tokens/sec and the share of batch slots holding real tokens at every log step and at the end"""
+    def __init__(self, collator):
+        self.collator = collator
+        self.started = None
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        self.collator.reset()
+        self.started = time.perf_counter()
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        real, padded = self.collator.real_tokens, self.collator.padded_tokens
+        return real / elapsed if elapsed else 0.0, real / padded if padded else 0.0
+
+    def on_log(self, args, state, control, logs=None, **kwargs):
+        if self.started is not None:
+            tokens_per_second, efficiency = self.report()
+            print(f"[step {state.global_step}] {tokens_per_second:.0f} tokens/s, {efficiency:.0%} real tokens per batch")
+
+    def on_train_end(self, args, state, control, **kwargs):
+        tokens_per_second, efficiency = self.report()
+        print(f"Training throughput: {tokens_per_second:.0f} tokens/s over {self.collator.real_tokens} tokens "
+              f"({efficiency:.0%} real tokens per batch)")
@@ -1,45 +1,68 @@
 import random
-import nltk
-from transformers import pipeline
-from nltk.tokenize import sent_tokenize
-nltk.download('punkt_tab', quiet=True)
-# Load NLI model
-nli = pipeline("text-classification", model="facebook/bart-large-mnli")
+from document import as_document, digest_of
+from quiz_cache import quiz_cache
+from nli_scorer import classify_statements
+from perturbation import default_engine, verify_contradictions
+import tracing
 
 class generate_true_false:
-    def __init__(self):
-        pass
+    def __init__(self, cache=quiz_cache, engine=None, verify=False, false_share=0.5):
+        self.cache = cache   # Generated quizzes by document and settings; None disables
+        self.engine = engine or default_engine()   # Rule-table perturbations (perturbation_rules.csv)
+        self.verify = verify                       # Keep only false statements the NLI model reads as contradictions
+        self.false_share = false_share             # Share of false statements when the difficulty has rules
     def validate_inputs(self, context, num_questions, difficulty):
-        if not context.strip():
+        document = as_document(context)   # Accepts raw text or a shared Document
+        if not document.text.strip():
             raise ValueError("Context cannot be empty.")
-        sentences = sent_tokenize(context)
-        return sentences
+        return document.sentences
 
     def apply_noise(self, sentence: str, level: str) -> str:
-        if level == "easy":
-            return sentence
-        elif level == "medium":
-            if "Sun" in sentence:
-                return sentence.replace("Sun", "Moon")
-            return sentence.replace("is", "is not") if "is" in sentence else sentence
-        elif level == "hard":
-            if "eight" in sentence:
-                return sentence.replace("eight", "ten")
-            return sentence.replace("planets", "stars") if "planets" in sentence else sentence
-        return sentence
+        return self.engine.perturb(sentence, level)
 
-    # Statement generator
-    def generate_statements(self, context, n, difficulty, sentences):
-        random.seed(42)
-        selected = random.sample(sentences, min(n * 2, len(sentences)))
-        final = []
-        for s in selected:
-            clean = s.strip()
-            modified = self.apply_noise(clean, difficulty)
-            label = "ENTAILMENT" if clean == modified else "CONTRADICTION"
-            final.append((modified, label))
-            if len(final) >= n:
+    def pick_false(self, sentences, perturbed, order, wanted, batch_size=8):
+        """Indices of up to wanted perturbable sentences in order, NLI-verified in batches when self.verify"""
+        candidates = [i for i in order if perturbed[i] is not None]
+        if not self.verify:
+            return candidates[:wanted]
+        accepted = []
+        chunk = max(2 * wanted, batch_size)
+        for start in range(0, len(candidates), chunk):
+            batch = candidates[start:start + chunk]
+            verdicts = verify_contradictions([sentences[i] for i in batch], [perturbed[i].text for i in batch], batch_size=batch_size)
+            accepted.extend(i for i, ok in zip(batch, verdicts) if ok)
+            tracing.count("perturbations_rejected", verdicts.count(False))
+            if len(accepted) >= wanted:
                 break
+        return accepted[:wanted]
+
+    # Statement generator
+    def generate_statements(self, context, n, difficulty, sentences=None):
+        """n (statement, label) pairs; sentences default to the document's own, split only on a cache miss"""
+        # Repeat requests for the same document and settings are served from the cache
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(digest_of(context), 'true_false', difficulty, n, self.engine.version, self.verify, self.false_share)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                tracing.count("quiz_cache_hits")
+                return [tuple(item) for item in cached]
+
+        if sentences is None:
+            sentences = self.validate_inputs(context, n, difficulty)
+        with tracing.span("statements"):
+            # Every sentence is perturbed in one pass; false statements come from those a rule applies to
+            clean = [s.strip() for s in sentences]
+            perturbed = self.engine.perturb_sentences(clean, difficulty)
+            order = random.Random(42).sample(range(len(clean)), len(clean))
+            wanted = min(n, int(n * self.false_share + 0.5)) if self.engine.has_rules(difficulty) else 0
+            false = set(self.pick_false(clean, perturbed, order, wanted))
+            true = set([i for i in order if i not in false][:n - len(false)])
+            final = [(perturbed[i].text, "CONTRADICTION") if i in false else (clean[i], "ENTAILMENT")
+                     for i in order if i in false or i in true]
+        if cache_key is not None and final:
+            self.cache.put(cache_key, final)
+        tracing.count("questions_generated", len(final))
         return final
 
     # Get valid user answer
@@ -51,21 +74,22 @@ class generate_true_false:
             print("Please enter 'true' or 'false'.")
 
     # Main quiz logic
-    def run_quiz(self, context, num_questions, difficulty):
+    def run_quiz(self, context, num_questions, difficulty, trim_premise=False):
         try:
-            sentences = self.validate_inputs(context, num_questions, difficulty)
+            document = as_document(context)
+            sentences = self.validate_inputs(document, num_questions, difficulty)
             questions = self.generate_statements(context, num_questions, difficulty, sentences)
+
+            # Grade every statement with facebook/bart-large-mnli in one batched pass
+            predictions = classify_statements(document, [statement for statement, _ in questions], trim_premise=trim_premise)
             
             print("\n--- QUIZ STARTS ---\n")
             score = 0
             
-            for idx, (statement, actual_label) in enumerate(questions, 1):
+            for idx, ((statement, actual_label), result) in enumerate(zip(questions, predictions), 1):
                 print(f"Q{idx}: {statement}")
                 user = self.get_user_answer()
                 
-                # Format input for facebook/bart-large-mnli
-                input_text = f"{context} [SEP] {statement}"
-                result = nli(input_text)[0]
                 if result["label"] == "neutral":
                     print("Skipping ambiguous statement.\n")
                     continue